@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul aplikasi (tubes_core, tubes_backtest, ...) berada di root repo, bukan paket terpasang
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
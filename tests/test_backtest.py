@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tubes_backtest import plan_chunks
+
+
+def make_arrays(first, last):
+    times = pd.date_range(first, last, freq='h').to_numpy()
+    return {'Dongsi': {'times': times, 'values': np.zeros((len(times), 1), dtype=np.float32)}}
+
+
+def covered_hours(chunks):
+    return sum(int((end - start) / pd.Timedelta(hours=1)) + 1 for _, start, end, _ in chunks)
+
+
+@pytest.mark.parametrize('freq', ['MS', 'YS'])
+def test_chunks_cover_range_without_gaps(freq):
+    arrays = make_arrays('2016-01-15 05:00', '2017-03-01 00:00')
+    chunks = plan_chunks(arrays, ['Dongsi'], None, None, freq)
+
+    assert chunks[0][1] == pd.Timestamp('2016-01-15 05:00')
+    assert chunks[-1][2] == pd.Timestamp('2017-03-01 00:00')
+    for (_, _, end, _), (_, next_start, _, _) in zip(chunks[:-1], chunks[1:]):
+        assert next_start - end == pd.Timedelta(hours=1)
+    assert covered_hours(chunks) == len(arrays['Dongsi']['times'])
+
+
+def test_last_hour_at_period_start_is_its_own_chunk():
+    arrays = make_arrays('2017-01-01 00:00', '2017-03-01 00:00')
+    chunks = plan_chunks(arrays, ['Dongsi'], None, None, 'MS')
+
+    assert [label for *_, label in chunks] == ['2017-01', '2017-02', '2017-03']
+    assert chunks[-1][1:3] == (pd.Timestamp('2017-03-01 00:00'), pd.Timestamp('2017-03-01 00:00'))
+
+
+@pytest.mark.parametrize('freq', ['MS', 'YS'])
+def test_single_hour_range_at_period_start(freq):
+    arrays = make_arrays('2016-01-01 00:00', '2017-03-01 00:00')
+    hour = pd.Timestamp('2017-01-01 00:00')
+    chunks = plan_chunks(arrays, ['Dongsi'], hour, hour, freq)
+
+    assert chunks == [('Dongsi', hour, hour, '2017-01' if freq == 'MS' else '2017')]
+
+
+def test_range_outside_data_gives_no_chunks():
+    arrays = make_arrays('2016-01-01 00:00', '2016-02-01 00:00')
+    assert plan_chunks(arrays, ['Dongsi'], pd.Timestamp('2017-01-01'), None, 'MS') == []
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tubes_core import (
+    FEATURE_COLS, load_inference_model, load_scaler_store, build_scaler_arrays, predict_batch, predict_windows,
+    scaler_params, scale_features, station_windows,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ROOT, 'model', 'pm25_lstm_model.keras')
+SCALER_PATH = os.path.join(ROOT, 'model', 'pm25_scalers.json')
+
+pytestmark = pytest.mark.skipif(not (os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH)),
+                                reason="file model / scaler tidak ada")
+
+
+def fixed_arrays(store, stations, hours=96, seed=0):
+    """Deret per stasiun dengan nilai acak (seed tetap) di dalam rentang min/max scaler stasiun tersebut."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2017-01-01', periods=hours, freq='h').to_numpy()
+    arrays = {}
+    for name in stations:
+        lo = np.array(store['stations'][name]['min'], dtype=np.float32)
+        hi = np.array(store['stations'][name]['max'], dtype=np.float32)
+        values = lo + rng.random((hours, len(FEATURE_COLS)), dtype=np.float32) * (hi - lo)
+        arrays[name] = {'times': times, 'values': values.astype(np.float32)}
+    return arrays
+
+
+def test_numpy_backend_matches_keras(tmp_path):
+    pytest.importorskip('tensorflow')
+    store = load_scaler_store(SCALER_PATH)
+    scalers = build_scaler_arrays(store)
+    arrays = fixed_arrays(store, sorted(store['stations'])[:3])
+
+    keras_model = load_inference_model('keras', MODEL_PATH)
+    # Ekspor .npz ke folder sementara agar artefak yang dilayani aplikasi tidak tersentuh
+    numpy_model = load_inference_model('numpy', MODEL_PATH, str(tmp_path / 'lean.npz'))
+
+    expected = predict_batch(keras_model, arrays, scalers)
+    actual = predict_batch(numpy_model, arrays, scalers)
+
+    assert len(actual) == len(expected) > 0
+    assert (actual['datetime'] == expected['datetime']).all()
+    # Dalam µg/m³ (nilai hingga ratusan) pembulatan float32 setelah unscale ikut terbawa: rtol bawaan 1e-5
+    assert np.allclose(actual['predicted'], expected['predicted'], atol=1e-5)
+
+    # Keluaran mentah model (skala 0..1) harus identik hingga 1e-5 secara absolut
+    for name, series in arrays.items():
+        data_min, scale = scaler_params(scalers, name)
+        windows = station_windows(scale_features(series['values'], data_min, scale))
+        np.testing.assert_allclose(predict_windows(numpy_model, windows), predict_windows(keras_model, windows),
+                                   rtol=0, atol=1e-5)
@@ -0,0 +1,191 @@
+"""Backtest headless model LSTM PM2.5 pada seluruh riwayat dataset (tanpa Streamlit).
+
+Jendela 24 jam digeser pada setiap stasiun dan setiap jam, prediksi dijalankan secara batch,
+lalu MAE/RMSE dilaporkan per stasiun, per bulan, dan per kategori AQI.
+
+Contoh:
+    python tubes_backtest.py --out backtest
+    python tubes_backtest.py --stations Dongsi Tiantan --start 2016-01-01 --end 2016-12-31
+
+Prediksi disimpan per potongan (stasiun x tahun/bulan) di <out>/predictions/ sehingga proses
+yang terputus bisa dilanjutkan: potongan yang sudah ada dilewati selama dataset & model sama.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from tubes_core import (
+    MODEL_PATH, LEAN_MODEL_PATH, FEATURE_COLS, PREDICT_BATCH_SIZE, AQI_CATEGORIES,
+    INFERENCE_BACKENDS, INFERENCE_BACKEND,
+    load_catalog, map_shared_dataset, read_partitions, load_inference_model, model_artifacts,
+    load_station_scalers, load_station_arrays,
+    station_time_bounds, predict_batch, classify_aqi,
+)
+
+
+def model_fingerprint(model_path):
+    stat = os.stat(model_path)
+    return {'path': os.path.abspath(model_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def lean_model_path(model_path):
+    """File .npz untuk backend numpy: artefak bawaan hanya untuk model bawaan; model lain diekspor ke
+    file saudara '<model>.numpy.npz' agar .npz yang dilayani aplikasi tidak pernah ditimpa."""
+    if os.path.abspath(model_path) == os.path.abspath(MODEL_PATH):
+        return LEAN_MODEL_PATH
+    return os.path.splitext(model_path)[0] + '.numpy.npz'
+
+
+def plan_chunks(arrays, stations, start, end, freq):
+    """Daftar (stasiun, awal, akhir, label) yang menutup rentang [start, end] per tahun ('YS') / bulan ('MS')."""
+    chunks = []
+    for station in stations:
+        first, last = station_time_bounds({station: arrays[station]})
+        lo = max(first, start) if start is not None else first
+        hi = min(last, end) if end is not None else last
+        if hi < lo:
+            continue
+        # Awal setiap periode sesudah lo; potongan terakhir berakhir di hi (inklusif), juga jika lo == hi
+        starts = [lo] + [t for t in pd.date_range(lo.to_period(freq[0]).start_time, hi, freq=freq) if t > lo]
+        for i, chunk_start in enumerate(starts):
+            chunk_end = starts[i + 1] - pd.Timedelta(hours=1) if i + 1 < len(starts) else hi
+            label = chunk_start.strftime('%Y' if freq == 'YS' else '%Y-%m')
+            chunks.append((station, chunk_start, chunk_end, label))
+    return chunks
+
+
+def prepare_output(out_dir, manifest, restart):
+    """Menyiapkan folder output; prediksi lama dibuang jika dataset/model berubah atau --restart."""
+    pred_dir = os.path.join(out_dir, 'predictions')
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if restart or previous != manifest:
+        if previous is not None:
+            print("Dataset/model berubah (atau --restart): prediksi lama dibuang.", file=sys.stderr)
+        for root, _, files in os.walk(pred_dir):
+            for file in files:
+                if file.endswith('.parquet'):
+                    os.remove(os.path.join(root, file))
+    os.makedirs(pred_dir, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return pred_dir
+
+
+def run_chunks(model, arrays, scalers, chunks, pred_dir, batch_size):
+    """Memproses potongan yang belum ada di disk sambil melaporkan progres; mengembalikan daftar file."""
+    paths = []
+    done_windows, t_start = 0, time.perf_counter()
+    for i, (station, chunk_start, chunk_end, label) in enumerate(chunks, 1):
+        path = os.path.join(pred_dir, f'station={station}', f'{label}.parquet')
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+        result = predict_batch(model, arrays, scalers, stations=[station],
+                               start=chunk_start, end=chunk_end, batch_size=batch_size)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        result.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+        done_windows += len(result)
+        elapsed = time.perf_counter() - t_start
+        rate = done_windows / elapsed if elapsed else 0.0
+        print(f"[{i}/{len(chunks)}] {station} {label}: {len(result):,} jendela, {rate:,.0f} jendela/detik",
+              file=sys.stderr)
+    return paths
+
+
+def error_metrics(df, by):
+    """MAE, RMSE, dan jumlah jendela per kelompok `by`."""
+    error = df['error'].astype(np.float64)
+    grouped = df.assign(abs_error=error.abs(), sq_error=error ** 2).groupby(by, observed=True)
+    metrics = pd.DataFrame({
+        'n': grouped.size(),
+        'MAE': grouped['abs_error'].mean(),
+        'RMSE': np.sqrt(grouped['sq_error'].mean()),
+    })
+    return metrics.round(3)
+
+
+def summarize(paths):
+    """Membaca semua prediksi lalu menghitung metrik per stasiun, bulan, dan kategori AQI."""
+    df = pd.concat([pd.read_parquet(p) for p in paths if os.path.exists(p)], ignore_index=True)
+    df = df[df['error'].notna()]
+    df['month'] = df['datetime'].dt.month
+    df['aqi'] = classify_aqi(df['actual'].to_numpy())
+    return {
+        'overall': error_metrics(df.assign(all='all'), 'all'),
+        'station': error_metrics(df, 'station'),
+        'month': error_metrics(df, 'month'),
+        'aqi': error_metrics(df, 'aqi').reindex(AQI_CATEGORIES),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest model LSTM PM2.5 pada seluruh riwayat dataset.")
+    parser.add_argument('--out', default='backtest', help="folder output (default: backtest)")
+    parser.add_argument('--model', default=MODEL_PATH, help="path model .keras")
+    parser.add_argument('--stations', nargs='+', help="stasiun yang diuji (default: semua)")
+    parser.add_argument('--start', type=pd.Timestamp, help="jam target pertama, mis. 2016-01-01")
+    parser.add_argument('--end', type=pd.Timestamp, help="jam target terakhir, mis. 2016-12-31 23:00")
+    parser.add_argument('--chunk', choices=['year', 'month'], default='year',
+                        help="ukuran potongan yang disimpan/dilanjutkan (default: year)")
+    parser.add_argument('--backend', choices=INFERENCE_BACKENDS, default=INFERENCE_BACKEND,
+                        help=f"backend inferensi (default: {INFERENCE_BACKEND})")
+    parser.add_argument('--batch-size', type=int, default=PREDICT_BATCH_SIZE)
+    parser.add_argument('--restart', action='store_true', help="abaikan potongan yang sudah ada")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    t_start = time.perf_counter()
+    catalog = map_shared_dataset(load_catalog())
+    stations = sorted(args.stations or catalog['stations'])
+    unknown = set(stations) - set(catalog['stations'])
+    if unknown:
+        raise SystemExit(f"Stasiun tidak dikenal: {', '.join(sorted(unknown))}")
+    # Hanya stasiun yang diuji dan kolom fitur model yang dibaca (view tanpa salinan bila ada salinan bersama)
+    arrays = load_station_arrays(catalog, stations=stations)
+    scalers = load_station_scalers(lambda: read_partitions(catalog, columns=['station', *FEATURE_COLS]),
+                                   stations=catalog['stations'])
+    n_rows = sum(len(series['times']) for series in arrays.values())
+    print(f"Dataset dimuat: {n_rows:,} baris ({time.perf_counter() - t_start:.1f} dtk)", file=sys.stderr)
+
+    lean_path = lean_model_path(args.model)
+    artifacts = model_artifacts(args.backend, args.model, lean_path)
+    if not artifacts:
+        raise SystemExit(f"Model tidak ditemukan: {args.model}")
+    manifest = {
+        'dataset_version': catalog['version'],
+        # .keras bila ada (sumber ekspor), selain itu .npz (replika ringan tanpa .keras)
+        'model': model_fingerprint(artifacts[0]),
+        'backend': args.backend,
+        # Rentang ikut dicatat agar potongan parsial dari run sebelumnya tidak dipakai ulang
+        'start': str(args.start), 'end': str(args.end), 'chunk': args.chunk,
+    }
+    pred_dir = prepare_output(args.out, manifest, args.restart)
+    chunks = plan_chunks(arrays, stations, args.start, args.end, 'YS' if args.chunk == 'year' else 'MS')
+
+    model = load_inference_model(args.backend, args.model, lean_path)
+    paths = run_chunks(model, arrays, scalers, chunks, pred_dir, args.batch_size)
+
+    metrics = summarize(paths)
+    for name, table in metrics.items():
+        table.to_csv(os.path.join(args.out, f'metrics_{name}.csv'))
+        print(f"\n== Metrik per {name} ==\n{table.to_string()}")
+    print(f"\nSelesai dalam {time.perf_counter() - t_start:.1f} dtk; prediksi di {pred_dir}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+"""Benchmark jalur panas dashboard (load, agregat, render, inferensi) tanpa Streamlit.
+
+Contoh:
+    python tubes_bench.py                                  # dataset asli, hasil JSON di bench/
+    python tubes_bench.py --scale 1 10 --repeat 3          # ditambah data sintetis 10x baris
+    python tubes_bench.py --only load lstm --backend numpy keras
+    python tubes_bench.py --baseline bench/lama.json --max-slowdown 1.25
+
+Setiap skala dijalankan di folder kerja sementara (dataset & file model ditautkan, cache kosong)
+sehingga cache milik aplikasi tidak tersentuh dan "cold load" benar-benar membangun cache dari CSV.
+Skala N membuat N salinan setiap CSV stasiun dengan nama stasiun berbeda (N x jumlah baris);
+skala 100 membutuhkan beberapa GB disk & RAM.
+
+Setiap hasil mencatat waktu (min/median/mean) dan puncak RSS proses selama benchmark itu berjalan.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from tubes_core import (
+    CACHE_DIR, DATASET_DIR, SHARED_DATASET_DIR, CUBE_CACHE_PATH, CORR_CACHE_PATH, STATS_CACHE_PATH,
+    NUMERIC_COLS, FEATURE_COLS, WINDOW_SIZE, INFERENCE_BACKENDS, CUBE_KEYS, CORR_KEYS, SEASONS,
+    find_csv_files, load_catalog, read_partitions, map_shared_dataset,
+    load_rollup_cube, rollup, load_summary_sketches, load_corr_stats, correlate, lagged_correlation,
+    aqi_distribution, classify_aqi, box_stats, downsample, heatmap_png, station_map_features, features_to_geojson,
+    load_inference_model, load_station_scalers, load_station_arrays, scaler_params, scale_features,
+    station_time_bounds, predict_batch, forecast_stations, rss_mb,
+)
+
+GROUPS = ['load', 'info', 'geo', 'eda', 'render', 'lstm']
+SUMMARY_COLS = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3']
+
+
+# --- Pengukuran waktu & memori ---
+
+def _reset_peak_rss():
+    """Mengatur ulang puncak RSS (Linux: /proc/self/clear_refs). Di OS lain puncak tetap kumulatif."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def measure(results, name, fn, repeat, setup=None, warmup=False, **extra):
+    """Menjalankan fn() `repeat` kali (setup() sebelum tiap run, tidak ikut diukur) dan mencatat hasilnya.
+
+    warmup=True menjalankan fn() sekali lebih dulu tanpa diukur (import/JIT/cache pertama).
+    Mengembalikan nilai kembalian run terakhir.
+    """
+    if warmup:
+        fn()
+    timings = []
+    gc.collect()
+    rss_before = rss_mb()
+    _reset_peak_rss()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t_start = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - t_start)
+    peak = rss_mb('VmHWM')
+    entry = {
+        'name': name,
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': float(np.median(timings)),
+        'mean_s': float(np.mean(timings)),
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(peak, 1),
+        **extra,
+    }
+    results.append(entry)
+    print(f"  {name:<40} {entry['median_s'] * 1e3:>10.2f} ms   puncak {entry['peak_rss_mb']:>7.0f} MB",
+          file=sys.stderr)
+    return value
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+# --- Folder kerja & data sintetis ---
+
+def _station_name(path):
+    return str(pd.read_csv(path, nrows=1, usecols=['station'])['station'].iloc[0])
+
+
+def write_scaled_dataset(csv_files, dest_dir, scale):
+    """Menulis `scale` salinan setiap CSV; salinan ke-i (i >= 1) memakai nama stasiun '<nama>-<i>'."""
+    os.makedirs(dest_dir, exist_ok=True)
+    for path in csv_files:
+        station = _station_name(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Kolom station adalah kolom terakhir, dengan atau tanpa tanda kutip
+        pattern = re.compile(rb'(,"?)' + re.escape(station.encode()) + rb'("?\r?)$', re.MULTILINE)
+        for i in range(scale):
+            name = station if i == 0 else f"{station}-{i}"
+            content = data if i == 0 else pattern.sub(rb'\g<1>' + name.encode() + rb'\g<2>', data)
+            out_name = os.path.basename(path).replace(f"_{station}_", f"_{name}_", 1)
+            if out_name == os.path.basename(path) and i:
+                out_name = f"{os.path.splitext(out_name)[0]}-{i}.csv"
+            with open(os.path.join(dest_dir, out_name), 'wb') as f:
+                f.write(content)
+
+
+def prepare_workdir(base_dir, scale, csv_files, model_dir):
+    """Folder kerja untuk satu skala: dataset/ (tautan atau salinan sintetis) dan model/ berisi tautan
+    per file, sehingga scaler/ekspor yang ditulis ulang tidak menimpa file model asli."""
+    workdir = os.path.join(base_dir, f"scale-{scale}")
+    _remove(workdir)
+    os.makedirs(os.path.join(workdir, 'model'))
+    for name in os.listdir(model_dir):
+        os.symlink(os.path.abspath(os.path.join(model_dir, name)), os.path.join(workdir, 'model', name))
+    if scale == 1:
+        os.symlink(os.path.abspath(os.path.dirname(os.path.commonpath(csv_files) + os.sep)),
+                   os.path.join(workdir, DATASET_DIR))
+    else:
+        write_scaled_dataset(csv_files, os.path.join(workdir, DATASET_DIR), scale)
+    return workdir
+
+
+# --- Rangkaian benchmark (dijalankan di dalam folder kerja) ---
+
+def bench_load(results, repeat, cold_repeat):
+    measure(results, 'load.cold', load_catalog, cold_repeat, setup=lambda: _remove(CACHE_DIR))
+    catalog = measure(results, 'load.warm', load_catalog, repeat)
+    measure(results, 'load.read_full', lambda: read_partitions(catalog), repeat)
+    year = catalog['years'][len(catalog['years']) // 2]
+    measure(results, 'load.read_year', lambda: read_partitions(catalog, years=[year]), repeat)
+    measure(results, 'load.shared_publish', lambda: map_shared_dataset(catalog), cold_repeat,
+            setup=lambda: _remove(SHARED_DATASET_DIR))
+    shared = measure(results, 'load.shared_map', lambda: map_shared_dataset(catalog), repeat)
+    measure(results, 'load.read_full_shared', lambda: read_partitions(shared), repeat)
+    return shared
+
+
+def bench_pages(results, catalog, repeat, cold_repeat, groups):
+    """Jalur komputasi setiap halaman (Info, Geo, EDA) dan render heatmap, seperti dipanggil aplikasi."""
+    version, year = catalog['version'], catalog['years'][len(catalog['years']) // 2]
+    cube = measure(results, 'aggregate.cube_build',
+                   lambda: load_rollup_cube(lambda: read_partitions(catalog, columns=CUBE_KEYS + NUMERIC_COLS),
+                                            version),
+                   cold_repeat, setup=lambda: _remove(CUBE_CACHE_PATH))
+    measure(results, 'aggregate.cube_load', lambda: load_rollup_cube(None, version), repeat)
+
+    if 'info' in groups:
+        pm25 = read_partitions(catalog, columns=['year', 'PM2.5'])
+        measure(results, 'info.classify_aqi', lambda: classify_aqi(pm25['PM2.5'].to_numpy()), repeat)
+        measure(results, 'info.aqi_distribution', lambda: aqi_distribution(pm25), repeat)
+        del pm25
+        measure(results, 'info.sketches_build',
+                lambda: load_summary_sketches(lambda: read_partitions(catalog, columns=['station', *NUMERIC_COLS]),
+                                              version),
+                cold_repeat, setup=lambda: _remove(STATS_CACHE_PATH))
+        measure(results, 'info.station_profile', lambda: rollup(cube, 'station', SUMMARY_COLS), repeat)
+
+    if 'geo' in groups:
+        def geo_features():
+            stats = rollup(cube, 'station', ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3'], year=year).reset_index()
+            return features_to_geojson(station_map_features(stats, 'PM2.5'))
+        measure(results, 'geo.map_features', geo_features, repeat)
+
+    if 'eda' in groups:
+        measure(results, 'eda.monthly_trend', lambda: rollup(cube, 'month', SUMMARY_COLS, year=year), repeat)
+        df_year = read_partitions(catalog, years=[year])
+        # Pembanding: groupby & korelasi langsung dari baris mentah (cara lama per rerun)
+        measure(results, 'eda.station_groupby_raw',
+                lambda: df_year.groupby('station', observed=True)[SUMMARY_COLS].mean(), repeat)
+        measure(results, 'eda.corr_raw', lambda: df_year[NUMERIC_COLS].corr(), repeat)
+        del df_year
+        stats = measure(results, 'eda.corr_stats_build',
+                        lambda: load_corr_stats(lambda: read_partitions(catalog, columns=CORR_KEYS + NUMERIC_COLS),
+                                                version),
+                        cold_repeat, setup=lambda: _remove(CORR_CACHE_PATH))
+        winter = SEASONS['Musim dingin (Des–Feb)']
+        measure(results, 'eda.correlate_scope', lambda: correlate(stats, year=year, month=winter), repeat)
+        lag_df = read_partitions(catalog, columns=['station', 'datetime', 'PM2.5', 'WSPM'])
+        measure(results, 'eda.lagged_correlation_48h', lambda: lagged_correlation(lag_df, 'PM2.5', 'WSPM', 48),
+                repeat)
+        del lag_df
+        measure(results, 'eda.box_stats',
+                lambda: box_stats(read_partitions(catalog, years=[year], columns=['station', 'PM2.5']),
+                                  'station', 'PM2.5'), repeat)
+        series = read_partitions(catalog, stations=catalog['stations'][:1], columns=['datetime', 'PM2.5'])
+        measure(results, 'eda.downsample_lttb', lambda: downsample(series, 'datetime', ['PM2.5']), repeat)
+
+    if 'render' in groups:
+        profile = rollup(cube, 'station', SUMMARY_COLS).round(2)
+        norm = (profile - profile.min()) / (profile.max() - profile.min())
+        measure(results, 'render.station_heatmap_png',
+                lambda: heatmap_png(norm, profile.values, '.0f', 'YlOrRd', linewidths=0.5), repeat, warmup=True)
+        corr = correlate(load_corr_stats(lambda: read_partitions(catalog, columns=CORR_KEYS + NUMERIC_COLS),
+                                         version), year=year)
+        measure(results, 'render.correlation_heatmap_png',
+                lambda: heatmap_png(corr, True, '.2f', 'coolwarm', figsize=(10, 8)), repeat, warmup=True)
+
+
+def bench_lstm(results, catalog, repeat, cold_repeat, backends):
+    """Inferensi: muat model, satu jendela, batch satu stasiun x satu bulan, dan prakiraan 24 jam semua stasiun."""
+    arrays = measure(results, 'lstm.station_arrays', lambda: load_station_arrays(catalog), repeat)
+    scalers = load_station_scalers(lambda: read_partitions(catalog, columns=['station', *FEATURE_COLS]),
+                                   stations=catalog['stations'])
+    station = next(iter(arrays))
+    first, last = station_time_bounds({station: arrays[station]})
+    month_start = max(first + pd.Timedelta(hours=WINDOW_SIZE), last - pd.Timedelta(days=30))
+    data_min, scale = scaler_params(scalers, station)
+    window = scale_features(arrays[station]['values'][-WINDOW_SIZE:], data_min, scale)[None]
+
+    for backend in backends:
+        try:
+            model = measure(results, f'lstm.{backend}.model_load', lambda: load_inference_model(backend), cold_repeat)
+        except ImportError as e:
+            print(f"  backend {backend} dilewati: {e}", file=sys.stderr)
+            continue
+        measure(results, f'lstm.{backend}.single_window', lambda: model.predict_on_batch(window),
+                max(repeat, 50), warmup=True)
+        batch = measure(results, f'lstm.{backend}.batch_station_month',
+                        lambda: predict_batch(model, arrays, scalers, stations=[station], start=month_start, end=last),
+                        repeat, warmup=True)
+        results[-1]['windows'] = len(batch)
+        results[-1]['windows_per_s'] = round(len(batch) / results[-1]['median_s'], 1)
+        measure(results, f'lstm.{backend}.forecast_24h_all_stations',
+                lambda: forecast_stations(model, arrays, scalers, last - pd.Timedelta(hours=24), 24),
+                repeat, warmup=True, stations=len(arrays))
+
+
+def run_suite(scale, args, csv_files, model_dir, base_dir):
+    """Menjalankan semua grup terpilih untuk satu skala di folder kerjanya; mengembalikan (meta, hasil)."""
+    workdir = prepare_workdir(base_dir, scale, csv_files, model_dir)
+    results, cwd = [], os.getcwd()
+    os.chdir(workdir)
+    try:
+        print(f"== Skala {scale}x ({workdir})", file=sys.stderr)
+        if 'load' in args.only:
+            catalog = bench_load(results, args.repeat, args.cold_repeat)
+        else:
+            catalog = map_shared_dataset(load_catalog())
+        if set(args.only) & {'info', 'geo', 'eda', 'render'}:
+            bench_pages(results, catalog, args.repeat, args.cold_repeat, args.only)
+        if 'lstm' in args.only:
+            bench_lstm(results, catalog, args.repeat, args.cold_repeat, args.backend)
+        meta = {'rows': catalog['rows'], 'stations': len(catalog['stations']), 'dataset_version': catalog['version']}
+    finally:
+        os.chdir(cwd)
+    for entry in results:
+        entry['scale'] = scale
+    return meta, results
+
+
+# --- Laporan & perbandingan dengan baseline ---
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+    }
+
+
+def compare(results, baseline_path):
+    """Rasio median terhadap baseline untuk benchmark (name, scale) yang sama; disimpan di setiap entri."""
+    with open(baseline_path) as f:
+        baseline = {(e['name'], e['scale']): e['median_s'] for e in json.load(f)['results']}
+    for entry in results:
+        base = baseline.get((entry['name'], entry['scale']))
+        if base:
+            entry['vs_baseline'] = round(entry['median_s'] / base, 3)
+    return [e for e in results if 'vs_baseline' in e]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark load, agregat, render, dan inferensi dashboard.")
+    parser.add_argument('--out', help="file JSON hasil (default: bench/bench-<waktu>.json)")
+    parser.add_argument('--scale', type=int, nargs='+', default=[1], help="kelipatan jumlah baris, mis. 1 10 100")
+    parser.add_argument('--repeat', type=int, default=5, help="pengulangan benchmark warm (default: 5)")
+    parser.add_argument('--cold-repeat', type=int, default=1, help="pengulangan benchmark cold (default: 1)")
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=GROUPS, help="grup yang dijalankan")
+    parser.add_argument('--backend', nargs='+', choices=INFERENCE_BACKENDS, default=['numpy'],
+                        help="backend inferensi yang diukur (default: numpy)")
+    parser.add_argument('--workdir', help="folder kerja (default: folder sementara yang dihapus setelahnya)")
+    parser.add_argument('--baseline', help="file JSON hasil sebelumnya sebagai pembanding")
+    parser.add_argument('--max-slowdown', type=float,
+                        help="exit code 1 jika ada benchmark yang lebih lambat dari baseline x nilai ini")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    csv_files = [os.path.abspath(p) for p in find_csv_files()]
+    if not csv_files:
+        raise SystemExit(f"Tidak ada file CSV di {DATASET_DIR}")
+    out_path = os.path.abspath(args.out or os.path.join('bench', time.strftime('bench-%Y%m%d-%H%M%S.json')))
+    base_dir = args.workdir or tempfile.mkdtemp(prefix='pdsd-bench-')
+
+    report = {'environment': environment(), 'args': vars(args), 'datasets': {}, 'results': []}
+    try:
+        for scale in args.scale:
+            meta, results = run_suite(scale, args, csv_files, os.path.abspath('model'), base_dir)
+            report['datasets'][str(scale)] = meta
+            report['results'].extend(results)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    compared = compare(report['results'], args.baseline) if args.baseline else []
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    table = pd.DataFrame(report['results']).set_index(['scale', 'name'])
+    table['median_ms'] = (table['median_s'] * 1e3).round(2)
+    cols = ['median_ms', 'peak_rss_mb'] + (['vs_baseline'] if compared else [])
+    print(table[cols].to_string())
+    print(f"\nHasil disimpan di {out_path}", file=sys.stderr)
+
+    if args.max_slowdown and compared:
+        slower = [e for e in compared if e['vs_baseline'] > args.max_slowdown]
+        for entry in slower:
+            print(f"REGRESI: {entry['name']} (skala {entry['scale']}x) {entry['vs_baseline']:.2f}x baseline",
+                  file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
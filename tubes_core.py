@@ -0,0 +1,2216 @@
+"""Logika inti dashboard kualitas udara Beijing (data, statistik, model) tanpa Streamlit.
+
+Dipakai oleh tubes_streamlit.py (dibungkus cache Streamlit) dan oleh skrip headless seperti
+tubes_backtest.py. TensorFlow hanya di-import saat model benar-benar dimuat.
+"""
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from numpy.lib.stride_tricks import sliding_window_view
+
+import os
+import json
+import contextlib
+import contextvars
+import fnmatch
+import functools
+import hashlib
+import io
+import pickle
+import shutil
+import zipfile
+import sqlite3
+import threading
+import time
+import multiprocessing as mp
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# --- Mengatasi error mutex/lock pada macOS ---
+os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
+os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+
+# Koordinat Stasiun (Geo-Analysis Data)
+STATION_COORDS = {
+    "Aotizhongxin": [39.982, 116.397],
+    "Changping": [40.217, 116.230],
+    "Dingling": [40.292, 116.220],
+    "Dongsi": [39.929, 116.417],
+    "Guanyuan": [39.929, 116.339],
+    "Gucheng": [39.914, 116.184],
+    "Huairou": [40.328, 116.628],
+    "Nongzhanguan": [39.937, 116.461],
+    "Shunyi": [40.127, 116.655],
+    "Tiantan": [39.886, 116.407],
+    "Wanliu": [39.987, 116.287],
+    "Wanshouxigong": [39.878, 116.352]
+}
+
+# Lokasi dataset & cache kolumnar (Parquet)
+DATASET_DIR = "./dataset"
+# File historis per stasiun, lalu file delta berisi jam-jam baru (boleh diletakkan kapan saja)
+CSV_PATTERNS = ("PRSA_Data_*.csv", "PRSA_Delta_*.csv")
+SKIP_DIRS = {".git", ".idea", "model", "cache", "__pycache__", "venv", ".venv"}
+CACHE_DIR = "./cache"
+# Cache dipartisi gaya Hive: prsa_data/year=YYYY/station=NAMA/part-NNNNN.parquet, sehingga filter
+# tahun/stasiun cukup memilih file dari metadata tanpa membuka partisi lain
+DATA_CACHE_DIR = os.path.join(CACHE_DIR, "prsa_data")
+DATA_CACHE_META = os.path.join(CACHE_DIR, "prsa_data.meta.json")
+IMPUTE_STATE_PATH = os.path.join(CACHE_DIR, "prsa_impute_state.pkl")
+# Jumlah byte terakhir file yang di-hash terpisah untuk mendeteksi CSV yang hanya bertambah baris
+TAIL_HASH_BYTES = 1 << 16
+# Naikkan versi ini setiap kali langkah preprocessing berubah agar cache lama dibangun ulang
+DATA_CACHE_VERSION = 7
+
+# Imputasi nilai kosong per stasiun: 'ffill', 'linear', 'time', atau 'seasonal' (rata-rata
+# stasiun x bulan x jam). Celah yang lebih panjang dari IMPUTE_MAX_GAP jam dibiarkan kosong (0 = tanpa batas).
+IMPUTE_STRATEGY = os.environ.get('PDSD_IMPUTE_STRATEGY', 'ffill')
+IMPUTE_MAX_GAP = int(os.environ.get('PDSD_IMPUTE_MAX_GAP', '0'))
+
+# Semua hal yang memengaruhi isi cache; perubahan salah satunya membuat cache dibangun ulang
+DATA_PIPELINE = {
+    'version': DATA_CACHE_VERSION,
+    'impute_strategy': IMPUTE_STRATEGY,
+    'impute_max_gap': IMPUTE_MAX_GAP,
+}
+
+# Ingest paralel: jumlah worker (0 = sebanyak core/file) dan jenisnya ('thread' atau 'process').
+# Pembaca CSV pyarrow melepas GIL sehingga thread sudah berjalan paralel.
+INGEST_WORKERS = int(os.environ.get('PDSD_INGEST_WORKERS', '0'))
+INGEST_EXECUTOR = os.environ.get('PDSD_INGEST_EXECUTOR', 'thread')
+
+# Skema kolom yang ringkas: integer kecil untuk waktu, float32 untuk pengukuran, kategori untuk teks.
+# Kolom 'No' (nomor baris) tidak dibaca karena redundan.
+NUMERIC_COLS = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3', 'TEMP', 'PRES', 'DEWP', 'RAIN', 'WSPM']
+WIND_DIRECTIONS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                   'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+ONE_HOUR = np.timedelta64(1, 'h')
+CSV_SCHEMA = {
+    'year': pa.int16(), 'month': pa.int8(), 'day': pa.int8(), 'hour': pa.int8(),
+    **{col: pa.float32() for col in NUMERIC_COLS},
+    'wd': pa.dictionary(pa.int32(), pa.string()),
+    'station': pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+# --- Instrumentasi: tahap-tahap per rerun (durasi, cache hit/miss, baris, delta memori) ---
+# Opsional: setiap profil ditulis sebagai satu baris JSON, dan metrik kumulatif proses ditulis
+# dalam format teks Prometheus (cocok untuk textfile collector node_exporter)
+PROFILE_LOG_PATH = os.environ.get('PDSD_PROFILE_LOG', '')
+PROFILE_METRICS_PATH = os.environ.get('PDSD_PROFILE_METRICS', '')
+
+_current_profile = contextvars.ContextVar('pdsd_profile', default=None)
+
+
+def rss_mb(field='VmRSS'):
+    """RSS proses saat ini ('VmRSS') atau puncaknya ('VmHWM') dalam MB; cadangan: ru_maxrss (hanya puncak)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20 if os.uname().sysname == 'Darwin' else 1024)
+
+
+class RerunProfile:
+    """Catatan tahap untuk satu rerun halaman (atau satu aksi pengguna) dalam satu thread/sesi.
+
+    Setiap tahap adalah dict: stage, depth (tingkat bersarang), seconds, rss_delta_mb, rows, dan
+    cache ('hit'/'miss'/None). Urutan daftar mengikuti urutan tahap dimulai.
+    """
+
+    def __init__(self, page, action=None):
+        self.page = page
+        self.action = action
+        self.timestamp = time.time()
+        self.records = []
+        self._open = []
+
+    def to_dict(self, total_seconds=None):
+        return {'timestamp': self.timestamp, 'page': self.page, 'action': self.action,
+                'total_seconds': total_seconds, 'stages': self.records}
+
+
+def start_profile(page, action=None):
+    """Memulai profil baru untuk konteks (thread) saat ini; tahap-tahap berikutnya dicatat ke sini."""
+    profile = RerunProfile(page, action)
+    _current_profile.set(profile)
+    return profile
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+@contextlib.contextmanager
+def stage(name, rows=None, cache=False):
+    """Mengukur satu tahap; yield dict record sehingga pemanggil bisa mengisi record['rows'].
+
+    cache=True menandai tahap sebagai pembungkus cache: 'hit' kecuali cache_miss() dipanggil di dalamnya.
+    Tanpa profil aktif (skrip headless) tahap tidak dicatat.
+    """
+    profile = _current_profile.get()
+    record = {'stage': name, 'rows': rows, 'cache': 'hit' if cache else None}
+    if profile is None:
+        yield record
+        return
+    record['depth'] = len(profile._open)
+    profile.records.append(record)
+    profile._open.append(record)
+    rss_start, t_start = rss_mb(), time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - t_start
+        record['rss_delta_mb'] = rss_mb() - rss_start
+        profile._open.pop()
+
+
+def cache_miss():
+    """Dipanggil di dalam fungsi ber-cache: tahap cache terdalam yang sedang terbuka dicatat sebagai 'miss'."""
+    profile = _current_profile.get()
+    for record in reversed(profile._open if profile is not None else []):
+        if record['cache'] is not None:
+            record['cache'] = 'miss'
+            return
+
+
+def profiled(name=None, cache=False):
+    """Dekorator: setiap panggilan fungsi menjadi satu tahap (lihat stage)."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, cache=cache):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfileMetrics:
+    """Metrik kumulatif per (halaman, tahap) untuk semua sesi dalam satu proses (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._pages = {}
+
+    def observe(self, profile, total_seconds):
+        with self._lock:
+            page = self._pages.setdefault(profile.page, [0, 0.0])
+            page[0] += 1
+            page[1] += total_seconds
+            for record in profile.records:
+                entry = self._stages.setdefault((profile.page, record['stage']),
+                                                {'count': 0, 'seconds': 0.0, 'rows': 0, 'hit': 0, 'miss': 0})
+                entry['count'] += 1
+                entry['seconds'] += record.get('seconds', 0.0)
+                entry['rows'] += record['rows'] or 0
+                if record['cache'] is not None:
+                    entry[record['cache']] += 1
+
+    def prometheus_text(self):
+        """Metrik dalam format eksposisi teks Prometheus."""
+        def label(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        with self._lock:
+            pages = sorted(self._pages.items())
+            stages = sorted(self._stages.items())
+        lines = ['# HELP pdsd_rerun_seconds Total durasi rerun per halaman.',
+                 '# TYPE pdsd_rerun_seconds summary']
+        for page, (count, seconds) in pages:
+            lines += [f'pdsd_rerun_seconds_count{{page="{label(page)}"}} {count}',
+                      f'pdsd_rerun_seconds_sum{{page="{label(page)}"}} {seconds:.6f}']
+        lines += ['# HELP pdsd_stage_seconds Durasi tahap per halaman.', '# TYPE pdsd_stage_seconds summary']
+        for (page, name), entry in stages:
+            labels = f'page="{label(page)}",stage="{label(name)}"'
+            lines += [f'pdsd_stage_seconds_count{{{labels}}} {entry["count"]}',
+                      f'pdsd_stage_seconds_sum{{{labels}}} {entry["seconds"]:.6f}']
+        lines += ['# HELP pdsd_stage_rows_total Baris yang diproses per tahap.', '# TYPE pdsd_stage_rows_total counter']
+        lines += [f'pdsd_stage_rows_total{{page="{label(page)}",stage="{label(name)}"}} {entry["rows"]}'
+                  for (page, name), entry in stages if entry['rows']]
+        lines += ['# HELP pdsd_cache_requests_total Panggilan fungsi ber-cache menurut hasil (hit/miss).',
+                  '# TYPE pdsd_cache_requests_total counter']
+        for (page, name), entry in stages:
+            if entry['hit'] or entry['miss']:
+                lines += [f'pdsd_cache_requests_total{{page="{label(page)}",stage="{label(name)}",'
+                          f'result="{result}"}} {entry[result]}' for result in ('hit', 'miss')]
+        lines += ['# HELP pdsd_process_resident_memory_mb RSS proses saat ini.',
+                  '# TYPE pdsd_process_resident_memory_mb gauge',
+                  f'pdsd_process_resident_memory_mb {rss_mb():.1f}']
+        return '\n'.join(lines) + '\n'
+
+
+PROFILE_METRICS = ProfileMetrics()
+
+
+def finish_profile(profile, total_seconds, metrics=PROFILE_METRICS, log_path=PROFILE_LOG_PATH,
+                   metrics_path=PROFILE_METRICS_PATH):
+    """Menutup profil: menambah metrik proses, lalu (opsional) menulis log JSON & file teks Prometheus."""
+    _current_profile.set(None)
+    metrics.observe(profile, total_seconds)
+    if log_path:
+        os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+        with open(log_path, 'a') as f:
+            f.write(json.dumps(profile.to_dict(total_seconds), default=str) + '\n')
+    if metrics_path:
+        tmp_path = f"{metrics_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(metrics.prometheus_text())
+        os.replace(tmp_path, metrics_path)
+    return profile.to_dict(total_seconds)
+
+
+def find_csv_files(base_dir=DATASET_DIR):
+    """Mencari file CSV PRSA Data tanpa memindai folder yang tidak relevan (.git, model/, .idea, ...)."""
+    if not os.path.isdir(base_dir):
+        base_dir = "."
+
+    found = {pattern: [] for pattern in CSV_PATTERNS}
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith("."))
+        for file in sorted(files):
+            for pattern in CSV_PATTERNS:
+                if fnmatch.fnmatch(file, pattern):
+                    found[pattern].append(os.path.join(root, file))
+                    break
+    # File historis selalu lebih dulu daripada file delta agar baris lama yang menang saat duplikat
+    return [path for pattern in CSV_PATTERNS for path in found[pattern]]
+
+
+def _file_hash(path, start=0, end=None, chunk_size=1 << 20):
+    """Hash isi file (blake2b) pada rentang byte [start, end), dibaca per blok agar hemat memori."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (end - start) if end is not None else None
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def csv_fingerprint(csv_files, previous=None):
+    """Sidik jari (mtime, ukuran, hash, hash ekor) tiap CSV.
+
+    Hash hanya dihitung ulang jika mtime atau ukuran berbeda dari sidik jari sebelumnya,
+    sehingga pengecekan saat cold start cukup memanggil os.stat.
+    """
+    previous = previous or {}
+    fingerprint = {}
+    for path in csv_files:
+        stat = os.stat(path)
+        key = os.path.basename(path)
+        old = previous.get(key)
+        if old and old["mtime_ns"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+            file_hash, tail_hash = old["hash"], old["tail_hash"]
+        else:
+            file_hash = _file_hash(path)
+            tail_hash = _file_hash(path, max(0, stat.st_size - TAIL_HASH_BYTES), stat.st_size)
+        fingerprint[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                            "hash": file_hash, "tail_hash": tail_hash}
+    return fingerprint
+
+
+def _same_content(fp_a, fp_b):
+    """True jika kedua sidik jari menunjuk ke himpunan file dengan isi (ukuran + hash) yang sama."""
+    if fp_a.keys() != fp_b.keys():
+        return False
+    return all(
+        fp_a[k]["size"] == fp_b[k]["size"] and fp_a[k]["hash"] == fp_b[k]["hash"]
+        for k in fp_a
+    )
+
+
+def appended_sources(csv_files, fingerprint, cached_fp):
+    """Daftar (path, offset) berisi byte baru jika perubahan sejak cache hanya berupa penambahan:
+    file baru (offset 0) atau CSV yang bertambah baris di akhir. None jika perlu bangun ulang penuh."""
+    if set(cached_fp) - set(fingerprint):
+        return None
+    sources = []
+    for path in csv_files:
+        key = os.path.basename(path)
+        new, old = fingerprint[key], cached_fp.get(key)
+        if old is None:
+            sources.append((path, 0))
+        elif new["size"] == old["size"] and new["hash"] == old["hash"]:
+            continue
+        elif (new["size"] > old["size"]
+              and _file_hash(path, max(0, old["size"] - TAIL_HASH_BYTES), old["size"]) == old["tail_hash"]
+              and _ends_with_newline(path, old["size"])):
+            sources.append((path, old["size"]))
+        else:
+            return None
+    return sources
+
+
+def _ends_with_newline(path, size):
+    """True jika byte ke-`size` terakhir file adalah akhir baris (baris lama tidak terpotong)."""
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def _read_cache_meta():
+    """Metadata cache jika ada dan dibuat oleh pipeline yang sama; selain itu dict kosong."""
+    try:
+        with open(DATA_CACHE_META) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if meta.get("pipeline") != DATA_PIPELINE:
+        return {}
+    if not all(os.path.exists(os.path.join(DATA_CACHE_DIR, part["path"])) for part in meta.get("parts", [])):
+        return {}
+    return meta
+
+
+def _write_cache_meta(fingerprint, parts, stations):
+    tmp_path = DATA_CACHE_META + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"pipeline": DATA_PIPELINE, "stations": stations, "parts": parts, "files": fingerprint},
+                  f, indent=1)
+    os.replace(tmp_path, DATA_CACHE_META)
+
+
+def _write_cache_part(df, index):
+    """Menulis satu potongan (base = 0, append = 1, 2, ...) sebagai file per partisi
+    year=YYYY/station=NAMA dan mengembalikan entri metadatanya."""
+    parts = []
+    for (station, year), group in df.groupby(['station', 'year'], sort=False, observed=True):
+        path = os.path.join(f"year={year}", f"station={station}", f"part-{index:05d}.parquet")
+        full_path = os.path.join(DATA_CACHE_DIR, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        group.to_parquet(full_path + ".tmp", index=False)
+        os.replace(full_path + ".tmp", full_path)
+        parts.append({"path": path, "year": int(year), "station": str(station), "index": index,
+                      "rows": len(group)})
+    return parts
+
+
+def _save_pickle(obj, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _load_pickle(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _materialize(df):
+    """DataFrame dari `df` yang boleh berupa DataFrame atau fungsi pemuat tanpa argumen."""
+    return df() if callable(df) else df
+
+
+def dataset_version(fingerprint):
+    """Token pendek yang berubah setiap kali isi CSV sumber atau versi preprocessing berubah."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps(DATA_PIPELINE, sort_keys=True).encode())
+    for key in sorted(fingerprint):
+        digest.update(f"{key}:{fingerprint[key]['size']}:{fingerprint[key]['hash']}".encode())
+    return digest.hexdigest()
+
+
+def read_station_csv(source):
+    """Membaca, memberi tipe, dan menambahkan kolom datetime untuk satu file stasiun (dijalankan di worker).
+
+    `source` boleh berupa path atau buffer berisi CSV lengkap dengan header.
+    """
+    table = pacsv.read_csv(
+        source,
+        # Paralelisme sudah di tingkat file; thread internal pyarrow dimatikan agar tidak berebut core
+        read_options=pacsv.ReadOptions(use_threads=False),
+        convert_options=pacsv.ConvertOptions(
+            column_types=CSV_SCHEMA, include_columns=list(CSV_SCHEMA), strings_can_be_null=True
+        ),
+    )
+
+    # Data Cleaning & Datetime
+    parts = pd.DataFrame({k: table[k].to_numpy() for k in ['year', 'month', 'day', 'hour']})
+    return table.append_column('datetime', pa.array(pd.to_datetime(parts).to_numpy()))
+
+
+def read_csv_tail(path, offset):
+    """Membaca hanya byte mulai `offset` (baris-baris baru) dari sebuah CSV, memakai header file itu."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        body = f.read()
+    return read_station_csv(io.BytesIO(header + body))
+
+
+def _segment_bounds(station_codes):
+    """Indeks awal & akhir (eksklusif) segmen stasiun untuk setiap baris; data harus urut per stasiun."""
+    n = len(station_codes)
+    starts = np.flatnonzero(np.r_[True, station_codes[1:] != station_codes[:-1]])
+    ends = np.r_[starts[1:], n]
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    return starts[seg], ends[seg]
+
+
+def _nearest_valid(valid, seg_start, seg_end):
+    """Indeks nilai valid sebelumnya & berikutnya di dalam segmen stasiun yang sama (-1 / n jika tidak ada)."""
+    n = len(valid)
+    idx = np.arange(n)
+    prev = np.maximum.accumulate(np.where(valid, idx, -1))
+    prev[prev < seg_start] = -1
+    nxt = np.minimum.accumulate(np.where(valid, idx, n)[::-1])[::-1]
+    nxt[nxt >= seg_end] = n
+    return prev, nxt
+
+
+def imputation_state(raw, previous=None):
+    """Ringkasan data mentah (sebelum imputasi) yang dibutuhkan untuk mengimputasi baris baru
+    tanpa membaca ulang riwayat: pengamatan terakhir per stasiun/kolom beserta waktunya, jam terakhir
+    tiap stasiun, dan jumlah/hitungan per stasiun x bulan x jam (untuk strategi 'seasonal').
+    Jika `previous` diberikan, hasilnya adalah gabungan keduanya.
+    """
+    cols = NUMERIC_COLS + ['wd']
+    station = raw['station'].astype(str)
+    observed_time = pd.DataFrame({col: raw['datetime'].where(raw[col].notna()) for col in cols})
+    season_keys = [station, raw['month'], raw['hour']]
+    state = {
+        'last_value': raw[cols].assign(wd=raw['wd'].astype(object)).groupby(station).last(),
+        'last_time': observed_time.groupby(station).max(),
+        'end_time': raw['datetime'].groupby(station).max(),
+        'season_sum': raw[NUMERIC_COLS].astype(np.float64).groupby(season_keys).sum(),
+        'season_count': raw[NUMERIC_COLS].groupby(season_keys).count(),
+    }
+    if previous is not None:
+        state['last_value'] = state['last_value'].combine_first(previous['last_value'])
+        state['last_time'] = state['last_time'].combine_first(previous['last_time'])
+        state['end_time'] = state['end_time'].combine(previous['end_time'], max, fill_value=pd.NaT)
+        for key in ('season_sum', 'season_count'):
+            state[key] = state[key].add(previous[key], fill_value=0)
+    return state
+
+
+def impute_missing(df, strategy=IMPUTE_STRATEGY, max_gap=IMPUTE_MAX_GAP, state=None):
+    """Mengisi nilai kosong per stasiun sesuai urutan waktu, secara vektor dalam satu lintasan per kolom.
+
+    `df` harus sudah urut (station, datetime). Strategi untuk kolom numerik:
+      - 'ffill'   : nilai teramati terakhir
+      - 'linear'  : interpolasi linear berdasarkan posisi baris (ujung akhir diisi ffill)
+      - 'time'    : interpolasi linear berdasarkan selisih waktu (ujung akhir diisi ffill)
+      - 'seasonal': rata-rata stasiun x bulan x jam dari nilai yang teramati
+    Kolom 'wd' (kategori) selalu diisi dengan ffill. Celah lebih panjang dari `max_gap` jam
+    (jika > 0) dibiarkan kosong; nilai kosong di awal deret stasiun juga dibiarkan, kecuali
+    `state` (hasil imputation_state dari data sebelumnya) menyediakan pengamatan terakhirnya.
+    """
+    if strategy not in ('ffill', 'linear', 'time', 'seasonal'):
+        raise ValueError(f"Strategi imputasi tidak dikenal: {strategy}")
+
+    station_codes = df['station'].cat.codes.to_numpy()
+    stations = df['station'].cat.categories.astype(str)
+    seg_start, seg_end = _segment_bounds(station_codes)
+    n = len(df)
+    times = df['datetime'].to_numpy()
+    # Sumbu x untuk panjang celah & interpolasi; `step` = satu jam dalam satuan x
+    if strategy == 'time':
+        x, step = times.astype(np.int64), int(ONE_HOUR / np.timedelta64(1, 'ns'))
+    else:
+        x, step = np.arange(n, dtype=np.int64), 1
+
+    def anchor(col):
+        """Pengamatan terakhir sebelum baris pertama tiap stasiun (dari `state`), per baris."""
+        if state is None or n == 0:
+            return np.zeros(n, dtype=bool), np.zeros(n), np.zeros(n, dtype=np.int64)
+        value = state['last_value'][col].reindex(stations).to_numpy()[station_codes]
+        when = state['last_time'][col].reindex(stations).to_numpy(dtype='datetime64[ns]')[station_codes]
+        ok = ~pd.isna(when)
+        if col == 'wd':
+            value = pd.Categorical(value, categories=WIND_DIRECTIONS).codes
+            ok &= value >= 0
+        hours_before = np.where(ok, (times[seg_start] - np.where(ok, when, times[seg_start])) // ONE_HOUR, 0)
+        return ok, value, x[seg_start] - hours_before.astype(np.int64) * step
+
+    def fill_plan(valid, col):
+        prev, nxt = _nearest_valid(valid, seg_start, seg_end)
+        anchor_ok, anchor_value, anchor_x = anchor(col)
+        use_anchor = (prev < 0) & anchor_ok
+        left_x = np.where(prev >= 0, x[np.maximum(prev, 0)], np.where(use_anchor, anchor_x, x[seg_start] - step))
+        right_x = np.where(nxt < n, x[np.minimum(nxt, n - 1)], x[seg_end - 1] + step)
+        missing = ~valid
+        if max_gap:
+            missing &= (right_x - left_x) // step - 1 <= max_gap
+        has_left = missing & ((prev >= 0) | use_anchor)
+        return prev, nxt, has_left, missing, left_x, use_anchor, anchor_value
+
+    if strategy == 'seasonal':
+        season_key = (station_codes.astype(np.int64) * 12 + df['month'].to_numpy() - 1) * 24 + df['hour'].to_numpy()
+        n_keys = len(stations) * 12 * 24
+        if state is not None:
+            full_index = pd.MultiIndex.from_product([stations, range(1, 13), range(24)])
+            prior_sum = state['season_sum'].reindex(full_index, fill_value=0)
+            prior_count = state['season_count'].reindex(full_index, fill_value=0)
+
+    for col in NUMERIC_COLS:
+        values = df[col].to_numpy()
+        valid = ~np.isnan(values)
+        if valid.all():
+            continue
+        prev, nxt, has_left, missing, left_x, use_anchor, anchor_value = fill_plan(valid, col)
+        filled = values.copy()
+
+        if strategy == 'seasonal':
+            sums = np.bincount(season_key[valid], weights=values[valid], minlength=n_keys)
+            counts = np.bincount(season_key[valid], minlength=n_keys)
+            if state is not None:
+                sums = sums + prior_sum[col].to_numpy()
+                counts = counts + prior_count[col].to_numpy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                season_mean = (sums / counts).astype(values.dtype)
+            filled[missing] = season_mean[season_key[missing]]
+        else:
+            left_value = np.where(prev >= 0, values[np.maximum(prev, 0)], anchor_value).astype(values.dtype)
+            filled[has_left] = left_value[has_left]
+            if strategy in ('linear', 'time'):
+                inner = has_left & (nxt < n)
+                q = nxt[inner]
+                frac = (x[inner] - left_x[inner]) / (x[q] - left_x[inner])
+                filled[inner] = left_value[inner] + (values[q] - left_value[inner]) * frac
+        df[col] = filled
+
+    # Arah angin: kode kategori diisi dari pengamatan terakhir di stasiun yang sama
+    wd_codes = df['wd'].cat.codes.to_numpy()
+    valid = wd_codes >= 0
+    if not valid.all():
+        prev, _, has_left, _, _, use_anchor, anchor_value = fill_plan(valid, 'wd')
+        wd_codes = np.where(has_left, np.where(prev >= 0, wd_codes[np.maximum(prev, 0)], anchor_value), wd_codes)
+        df['wd'] = pd.Categorical.from_codes(wd_codes.astype(np.int8), dtype=df['wd'].dtype)
+    return df
+
+
+def _ingest_executor(n_files, workers=INGEST_WORKERS, kind=INGEST_EXECUTOR):
+    """Membuat pool worker untuk ingest; mode 'process' memakai fork (jika tersedia) agar fungsi
+    worker tidak perlu di-import ulang oleh proses anak."""
+    workers = workers or min(n_files, os.cpu_count() or 1)
+    if kind == 'process' and 'fork' in mp.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('fork'))
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def tables_to_frame(tables, station_categories=None):
+    """Menggabungkan tabel Arrow hasil read_station_csv menjadi DataFrame mentah yang urut
+    (station, datetime); jam yang muncul dua kali hanya diambil kemunculan pertamanya."""
+    # Tabel Arrow digabung tanpa menyalin (hanya menyambung potongan), lalu dikonversi ke pandas
+    # satu kali; self_destruct membebaskan buffer Arrow kolom demi kolom selama konversi.
+    table = pa.concat_tables(tables)
+    del tables
+    df = table.to_pandas(self_destruct=True, split_blocks=True)
+    del table
+
+    # Kategori stasiun selalu urut nama (riwayat + stasiun baru), sehingga append dan bangun ulang
+    # penuh menghasilkan urutan stasiun, baris, dan partisi yang sama untuk versi dataset yang sama
+    categories = sorted(set(station_categories or []) | set(df['station'].cat.categories))
+    df['station'] = df['station'].cat.set_categories(categories)
+    df['wd'] = df['wd'].cat.set_categories(WIND_DIRECTIONS)
+
+    # Urutan baris ditentukan oleh (stasiun, waktu), bukan oleh urutan file ditemukan
+    codes, times = df['station'].cat.codes.to_numpy(), df['datetime'].to_numpy()
+    same_station = codes[1:] == codes[:-1]
+    if (codes[1:] < codes[:-1]).any() or (times[1:][same_station] < times[:-1][same_station]).any():
+        df = df.sort_values(['station', 'datetime'], ignore_index=True, kind='stable')
+        codes, times = df['station'].cat.codes.to_numpy(), df['datetime'].to_numpy()
+    duplicated = np.r_[False, (codes[1:] == codes[:-1]) & (times[1:] == times[:-1])]
+    if duplicated.any():
+        df = df[~duplicated].reset_index(drop=True)
+    return df
+
+
+def build_dataset(csv_files, workers=INGEST_WORKERS, executor=INGEST_EXECUTOR):
+    """Membaca & membersihkan semua CSV secara paralel (jalur lambat, hanya saat cache tidak valid).
+
+    Mengembalikan (df, state) dengan state = imputation_state dari data mentah.
+    """
+    with stage('csv_read') as record:
+        with _ingest_executor(len(csv_files), workers, executor) as pool:
+            tables = list(pool.map(read_station_csv, csv_files))
+        df = tables_to_frame(tables)
+        record['rows'] = len(df)
+
+    # Handling Missing Values
+    with stage('impute', rows=len(df)):
+        state = imputation_state(df)
+        return impute_missing(df), state
+
+
+def append_delta(tables, state, station_categories):
+    """Membersihkan baris baru (tabel Arrow) tanpa menyentuh riwayat; biaya sebanding ukuran delta.
+
+    Baris untuk jam yang sudah ada di riwayat diabaikan. Baris baru diimputasi dengan `state`
+    sebagai pengamatan sebelumnya. Mengembalikan (delta, state); stasiun baru disisipkan ke kategori
+    yang tetap urut nama, sama seperti hasil bangun ulang penuh.
+    """
+    delta = tables_to_frame(tables, station_categories=station_categories)
+    end_time = state['end_time'].reindex(delta['station'].cat.categories.astype(str)).to_numpy(dtype='datetime64[ns]')
+    row_end = end_time[delta['station'].cat.codes.to_numpy()]
+    delta = delta[pd.isna(row_end) | (delta['datetime'].to_numpy() > row_end)].reset_index(drop=True)
+    if delta.empty:
+        return delta, state
+
+    new_state = imputation_state(delta, previous=state)
+    return impute_missing(delta, state=state), new_state
+
+
+def _catalog(fingerprint, parts=(), stations=(), frame=None):
+    """Ringkasan dataset dari metadata saja. `frame` hanya diisi jika cache tidak bisa ditulis ke disk."""
+    if frame is not None:
+        parts = [{"year": int(year), "station": str(station), "rows": int(n)}
+                 for (station, year), n in frame.groupby(['station', 'year'], observed=True).size().items()]
+        stations = list(frame['station'].cat.categories)
+    return {
+        'version': dataset_version(fingerprint),
+        'stations': list(stations),
+        'years': sorted({part['year'] for part in parts}),
+        'rows': sum(part['rows'] for part in parts),
+        'parts': list(parts),
+        'frame': frame,
+    }
+
+
+def sync_cache(csv_files):
+    """Menyelaraskan cache Parquet dengan CSV sumber lalu mengembalikan katalognya (lihat _catalog).
+
+    - isi sama           : hanya metadata yang dibaca, tidak ada partisi yang dibuka
+    - hanya penambahan   : parse byte baru saja, simpan sebagai potongan Parquet baru per partisi,
+                           lalu perbarui state imputasi, cube, korelasi, dan sketsa statistik secara inkremental
+    - perubahan lain     : bangun ulang penuh
+    """
+    meta = _read_cache_meta()
+    cached_fp = meta.get("files", {})
+    fingerprint = csv_fingerprint(csv_files, cached_fp)
+
+    if cached_fp and _same_content(fingerprint, cached_fp):
+        # Isi sama tetapi mtime berubah (mis. file di-touch / di-checkout ulang): cukup perbarui metadata
+        if fingerprint != cached_fp:
+            try:
+                _write_cache_meta(fingerprint, meta["parts"], meta["stations"])
+            except OSError:
+                pass
+        return _catalog(fingerprint, meta["parts"], meta["stations"])
+
+    sources = appended_sources(csv_files, fingerprint, cached_fp) if cached_fp else None
+    state = _load_pickle(IMPUTE_STATE_PATH) if sources is not None else None
+    if sources is not None and state is not None:
+        delta, state = append_delta([read_csv_tail(path, offset) for path, offset in sources], state,
+                                    meta["stations"])
+        stations, parts = meta["stations"], meta["parts"]
+        try:
+            if not delta.empty:
+                stations = list(delta['station'].cat.categories)
+                parts = parts + _write_cache_part(delta, max(part["index"] for part in parts) + 1)
+            _save_pickle(state, IMPUTE_STATE_PATH)
+            _write_cache_meta(fingerprint, parts, stations)
+        except OSError:
+            # Folder read-only: riwayat lama + baris baru digabung di memori
+            df = read_partitions(_catalog(cached_fp, meta["parts"], meta["stations"]))
+            df['station'] = df['station'].cat.set_categories(stations)
+            df = pd.concat([df, delta], ignore_index=True).sort_values(['station', 'datetime'], ignore_index=True,
+                                                                       kind='stable')
+            return _catalog(fingerprint, frame=df)
+        if not delta.empty:
+            update_derived_caches(dataset_version(cached_fp), dataset_version(fingerprint), delta)
+        return _catalog(fingerprint, parts, stations)
+
+    df, state = build_dataset(csv_files)
+    try:
+        shutil.rmtree(DATA_CACHE_DIR, ignore_errors=True)
+        parts = _write_cache_part(df, 0)
+        _save_pickle(state, IMPUTE_STATE_PATH)
+        _write_cache_meta(fingerprint, parts, list(df['station'].cat.categories))
+    except OSError:
+        # Folder read-only: aplikasi tetap jalan, seluruh data disimpan di memori
+        return _catalog(fingerprint, frame=df)
+    return _catalog(fingerprint, parts, df['station'].cat.categories)
+
+
+def _selected_parts(catalog, years=None, stations=None):
+    """Entri partisi yang lolos filter, urut (station, year, potongan) sesuai urutan baris dataset."""
+    order = {station: i for i, station in enumerate(catalog['stations'])}
+    return sorted((part for part in catalog['parts']
+                   if (years is None or part['year'] in years) and (stations is None or part['station'] in stations)),
+                  key=lambda part: (order[part['station']], part['year'], part.get('index', 0)))
+
+
+def read_partitions(catalog, years=None, stations=None, columns=None, filters=None):
+    """DataFrame berisi partisi (tahun, stasiun) yang diminta saja, urut (station, datetime).
+
+    Partisi dipilih dari katalog sehingga file lain tidak dibuka sama sekali; `columns` membatasi
+    kolom yang dibaca dan `filters` (format pyarrow, mis. [('month', '=', 1)]) diteruskan ke pembaca
+    Parquet sehingga row group yang tidak cocok dilewati. File dibaca lewat memory map. Jika katalog
+    memakai salinan bersama (map_shared_dataset), partisi diambil sebagai slice tanpa salinan.
+    """
+    with stage('read_partitions') as record:
+        df = _read_partitions(catalog, years, stations, columns, filters)
+        record['rows'] = len(df)
+    return df
+
+
+def _read_partitions(catalog, years, stations, columns, filters):
+    frame, shared = catalog['frame'], catalog.get('shared')
+    if frame is not None:
+        # Tanpa cache di disk: seleksi yang sama dilakukan pada DataFrame di memori
+        mask = np.ones(len(frame), dtype=bool)
+        if years is not None:
+            mask &= frame['year'].isin(years).to_numpy()
+        if stations is not None:
+            mask &= frame['station'].isin(stations).to_numpy()
+        table = pa.Table.from_pandas(frame[mask], preserve_index=False)
+    elif shared is not None:
+        # Rentang baris yang bersebelahan digabung sehingga satu stasiun/seluruh data = satu slice
+        ranges = []
+        for part in _selected_parts(catalog, years, stations):
+            start, n_rows = shared['offsets'][part['path']], part['rows']
+            if ranges and ranges[-1][0] + ranges[-1][1] == start:
+                ranges[-1][1] += n_rows
+            else:
+                ranges.append([start, n_rows])
+        slices = [shared['table'].slice(start, n_rows) for start, n_rows in ranges]
+        table = pa.concat_tables(slices) if slices else shared['table'].slice(0, 0)
+    else:
+        parts = _selected_parts(catalog, years, stations)
+        if parts:
+            table = pq.read_table([os.path.join(DATA_CACHE_DIR, part['path']) for part in parts],
+                                  columns=columns, filters=filters, partitioning=None, memory_map=True)
+        else:
+            # Tidak ada partisi yang cocok: tabel kosong dengan skema yang sama
+            table = pq.read_schema(os.path.join(DATA_CACHE_DIR, catalog['parts'][0]['path'])).empty_table()
+        filters = None
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(list(columns))
+    # Kolom numerik tanpa null dari salinan bersama menjadi view read-only (tanpa salinan)
+    df = table.to_pandas(self_destruct=shared is None, split_blocks=True)
+    del table
+    if 'station' in df:
+        df['station'] = df['station'].cat.set_categories(catalog['stations'])
+    if 'wd' in df:
+        df['wd'] = df['wd'].cat.set_categories(WIND_DIRECTIONS)
+    return df
+
+
+def source_signature(csv_files):
+    """Kunci murah (path, ukuran, mtime) untuk mendeteksi file baru/berubah tanpa membaca isinya."""
+    return tuple((path, os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in csv_files)
+
+
+def load_catalog(csv_files=None):
+    """Menyelaraskan cache lalu mengembalikan katalog dataset (lihat sync_cache) tanpa memuat datanya.
+    FileNotFoundError jika tidak ada CSV sama sekali."""
+    csv_files = find_csv_files() if csv_files is None else list(csv_files)
+    if not csv_files:
+        raise FileNotFoundError(f"Tidak ada file {CSV_PATTERNS[0]} di {DATASET_DIR}")
+    return sync_cache(csv_files)
+
+
+def load_dataset(csv_files=None, **selection):
+    """Memuat dataset PRSA (seluruhnya atau sebagian lewat argumen read_partitions: years, stations,
+    columns, filters) dari cache Parquet yang sudah diselaraskan dengan file CSV."""
+    catalog = load_catalog(csv_files)
+    df = read_partitions(catalog, **selection)
+    # Versi dataset dipakai sebagai kunci cache untuk semua agregat turunan
+    df.attrs['dataset_version'] = catalog['version']
+    return df
+
+
+# --- Salinan bersama: file Arrow IPC & NumPy yang di-memory-map read-only oleh semua sesi dan proses ---
+SHARED_DATASET_DIR = os.path.join(CACHE_DIR, "shared")
+# '0' mematikan salinan bersama (setiap proses membaca partisi Parquet sendiri)
+SHARED_DATASET = os.environ.get('PDSD_SHARED_DATASET', '1') == '1'
+
+
+def _shared_layout(catalog):
+    """Urutan baris salinan bersama: [stasiun, tahun, jumlah baris] per partisi, sesuai urutan read_partitions."""
+    layout = []
+    for part in _selected_parts(catalog):
+        if layout and layout[-1][:2] == [part['station'], part['year']]:
+            layout[-1][2] += part['rows']
+        else:
+            layout.append([part['station'], part['year'], part['rows']])
+    return layout
+
+
+def _shared_paths(catalog):
+    # Tata letak partisi ikut menjadi nama file: versi dataset yang sama dengan urutan baris berbeda
+    # tidak pernah memetakan file lama dengan offset yang salah
+    layout = hashlib.blake2b(json.dumps(_shared_layout(catalog)).encode(), digest_size=4).hexdigest()
+    stem = os.path.join(SHARED_DATASET_DIR, f"prsa-{catalog['version']}-{layout}")
+    return stem + ".arrow", stem + "-features.npy"
+
+
+def _shared_layout_matches(table, layout):
+    """Memeriksa stasiun & tahun pada baris pertama dan terakhir setiap partisi di salinan bersama."""
+    station, year, start = table.column('station'), table.column('year'), 0
+    for name, part_year, rows in layout:
+        for pos in (start, start + rows - 1):
+            if pos >= len(table) or station[pos].as_py() != name or year[pos].as_py() != part_year:
+                return False
+        start += rows
+    return start == len(table)
+
+
+def publish_shared_dataset(catalog):
+    """Menulis dataset bersih sekali per versi & tata letak partisi: tabel Arrow IPC tanpa kompresi
+    (urut station, datetime) dan matriks FEATURE_COLS float32 baris-per-baris (.npy). Mengembalikan kedua path-nya.
+
+    Nilai kosong disimpan sebagai NaN (bukan null Arrow) agar kolom numerik bisa dipakai tanpa salinan.
+    Versi lain di folder yang sama dihapus; proses yang masih memetakannya tidak terganggu.
+    """
+    arrow_path, features_path = _shared_paths(catalog)
+    if os.path.exists(arrow_path) and os.path.exists(features_path):
+        return arrow_path, features_path
+    os.makedirs(SHARED_DATASET_DIR, exist_ok=True)
+    df = read_partitions(catalog)
+    # Nama sementara per proses: beberapa replika boleh menerbitkan versi yang sama bersamaan
+    tmp_suffix = f".{os.getpid()}.tmp"
+
+    with open(features_path + tmp_suffix, "wb") as f:
+        np.save(f, np.ascontiguousarray(df[FEATURE_COLS].to_numpy(dtype=np.float32)))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    del df
+    table = pa.Table.from_arrays(
+        [pc.fill_null(col, np.nan) if pa.types.is_floating(col.type) else col for col in table.columns],
+        schema=table.schema,
+    ).combine_chunks()
+    with pa.OSFile(arrow_path + tmp_suffix, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max(len(table), 1))
+    os.replace(features_path + tmp_suffix, features_path)
+    os.replace(arrow_path + tmp_suffix, arrow_path)
+
+    for name in os.listdir(SHARED_DATASET_DIR):
+        path = os.path.join(SHARED_DATASET_DIR, name)
+        if path not in (arrow_path, features_path) and not name.endswith(".tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return arrow_path, features_path
+
+
+def map_shared_dataset(catalog, enabled=SHARED_DATASET):
+    """Katalog yang membaca dari salinan bersama (lihat publish_shared_dataset) lewat memory map.
+
+    Halaman file dipakai bersama lewat page cache OS: satu salinan fisik per host, tanpa deserialisasi
+    per sesi/proses. Jika salinan tidak bisa diterbitkan (mis. folder read-only), katalog asal dikembalikan.
+    """
+    if not enabled or catalog['frame'] is not None or catalog.get('shared') is not None:
+        return catalog
+    layout = _shared_layout(catalog)
+    # Salinan yang tidak cocok dengan tata letak katalog (file rusak/lama) diterbitkan ulang sekali
+    for attempt in range(2):
+        try:
+            arrow_path, features_path = publish_shared_dataset(catalog)
+            table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+            features = np.load(features_path, mmap_mode='r')
+        except (OSError, ValueError, pa.ArrowInvalid):
+            return catalog
+        if len(features) == len(table) and _shared_layout_matches(table, layout):
+            break
+        del table, features
+        for path in (arrow_path, features_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    else:
+        return catalog
+
+    # Offset baris tiap potongan partisi di dalam salinan bersama (urutannya sama dengan read_partitions)
+    offsets, start = {}, 0
+    for part in _selected_parts(catalog):
+        offsets[part['path']] = start
+        start += part['rows']
+    return {**catalog, 'shared': {'table': table, 'features': features, 'offsets': offsets}}
+
+
+# --- Rollup cube (station x year x month x hour) untuk semua tampilan EDA ---
+CUBE_KEYS = ['station', 'year', 'month', 'hour']
+
+
+def build_rollup_cube(df, value_cols=NUMERIC_COLS):
+    """Agregat sum, count, min, max, dan sum of squares per sel station/year/month/hour.
+
+    Kolom hasil berupa MultiIndex (statistik, kolom); indeks berupa MultiIndex CUBE_KEYS.
+    """
+    keys = [df[k] for k in CUBE_KEYS]
+    # Akumulasi dalam float64 agar sum of squares tidak kehilangan presisi (kolom disimpan float32)
+    values = df[list(value_cols)].astype(np.float64)
+    grouped = values.groupby(keys, observed=True, sort=True)
+    return pd.concat({
+        'sum': grouped.sum(),
+        'count': grouped.count(),
+        'min': grouped.min(),
+        'max': grouped.max(),
+        'sumsq': (values ** 2).groupby(keys, observed=True, sort=True).sum(),
+    }, axis=1)
+
+
+def merge_rollup_cubes(a, b):
+    """Menggabungkan dua cube (mis. cube riwayat + cube baris baru); sel yang sama digabung per statistik."""
+    combined = pd.concat([a, b])
+    merged = {}
+    for stat in ('sum', 'count', 'min', 'max', 'sumsq'):
+        grouped = combined[stat].groupby(level=CUBE_KEYS, observed=True, sort=True)
+        merged[stat] = getattr(grouped, stat if stat in ('min', 'max') else 'sum')()
+    cube = pd.concat(merged, axis=1)
+    # Level kategori dengan kategori berbeda (mis. ada stasiun baru) menjadi object setelah concat;
+    # dikembalikan ke kategori urut agar sama dengan cube hasil bangun ulang penuh
+    for i, level in enumerate(cube.index.levels):
+        was_category = isinstance(a.index.levels[i].dtype, pd.CategoricalDtype)
+        if was_category and not isinstance(level.dtype, pd.CategoricalDtype):
+            cube.index = cube.index.set_levels(pd.CategoricalIndex(level, categories=sorted(level)), level=i)
+    return cube
+
+
+CUBE_CACHE_PATH = os.path.join(CACHE_DIR, "prsa_cube.pkl")
+
+
+def load_rollup_cube(df, dataset_version):
+    """Cube untuk versi dataset tertentu: dibaca dari disk, atau dibangun lalu disimpan.
+
+    `df` boleh berupa fungsi tanpa argumen yang baru dipanggil jika cube harus dibangun.
+    """
+    cached = _load_pickle(CUBE_CACHE_PATH)
+    if cached is not None and cached.get('version') == dataset_version:
+        return cached['cube']
+    cube = build_rollup_cube(_materialize(df))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _save_pickle({'version': dataset_version, 'cube': cube}, CUBE_CACHE_PATH)
+    except OSError:
+        pass
+    return cube
+
+
+def rollup(cube, by, cols, stat='mean', **filters):
+    """Menurunkan statistik `stat` dari cube, dikelompokkan menurut level `by`.
+
+    `filters` membatasi sel cube, mis. rollup(cube, 'month', cols, year=2015).
+    by=None menghasilkan satu Series untuk seluruh sel yang terpilih.
+    stat: 'mean', 'sum', 'count', 'min', 'max', 'std', atau 'var'.
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    for level, value in filters.items():
+        if value is not None:
+            mask &= cube.index.get_level_values(level).isin(np.atleast_1d(value))
+    cube = cube[mask]
+    cols = list(cols)
+    if by is None:
+        grouped = cube.groupby(np.zeros(len(cube), dtype=np.int8))
+    else:
+        grouped = cube.groupby(level=by, observed=True)
+
+    if stat in ('min', 'max'):
+        result = getattr(grouped, stat)()[stat][cols]
+    else:
+        sums = grouped.sum()
+        total, count = sums['sum'][cols], sums['count'][cols]
+        if stat == 'sum':
+            result = total
+        elif stat == 'count':
+            result = count
+        elif stat == 'mean':
+            result = total / count
+        elif stat in ('var', 'std'):
+            result = (sums['sumsq'][cols] - total ** 2 / count) / (count - 1)
+            if stat == 'std':
+                result = np.sqrt(result.clip(lower=0))
+        else:
+            raise ValueError(f"Statistik tidak dikenal: {stat}")
+    return result.iloc[0] if by is None else result
+
+
+# --- Statistik deskriptif satu-lintasan & bisa digabung (Welford + sketsa kuantil) ---
+STATS_CACHE_PATH = os.path.join(CACHE_DIR, "prsa_stats.json")
+# Akurasi relatif kuantil (DDSketch): nilai kuantil meleset paling banyak 1% dari nilai sebenarnya
+SKETCH_RELATIVE_ACCURACY = 0.01
+_SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_SKETCH_LOG_GAMMA = np.log(_SKETCH_GAMMA)
+
+
+def _log_buckets(values):
+    """Histogram logaritmik {indeks_bucket: jumlah} untuk nilai positif."""
+    if len(values) == 0:
+        return {}
+    keys, counts = np.unique(np.ceil(np.log(values) / _SKETCH_LOG_GAMMA).astype(np.int64), return_counts=True)
+    return dict(zip(keys.tolist(), counts.tolist()))
+
+
+def column_sketch(values):
+    """Ringkasan satu kolom untuk satu potongan data: count, mean, M2, min, max, dan histogram log."""
+    values = np.asarray(values, dtype=np.float64)
+    present = values[~np.isnan(values)]
+    n = len(present)
+    mean = float(present.mean()) if n else 0.0
+    return {
+        'n': n,
+        'missing': int(len(values) - n),
+        'mean': mean,
+        'm2': float(((present - mean) ** 2).sum()) if n else 0.0,
+        'min': float(present.min()) if n else np.inf,
+        'max': float(present.max()) if n else -np.inf,
+        'zero': int((present == 0).sum()),
+        'pos': _log_buckets(present[present > 0]),
+        'neg': _log_buckets(-present[present < 0]),
+    }
+
+
+def merge_sketches(a, b):
+    """Menggabungkan dua sketsa (rumus paralel Chan untuk mean/varians, penjumlahan histogram)."""
+    n = a['n'] + b['n']
+    delta = b['mean'] - a['mean']
+    merged = {
+        'n': n,
+        'missing': a['missing'] + b['missing'],
+        'mean': a['mean'] + delta * b['n'] / n if n else 0.0,
+        'm2': a['m2'] + b['m2'] + (delta ** 2 * a['n'] * b['n'] / n if n else 0.0),
+        'min': min(a['min'], b['min']),
+        'max': max(a['max'], b['max']),
+        'zero': a['zero'] + b['zero'],
+    }
+    for side in ('pos', 'neg'):
+        buckets = dict(a[side])
+        for key, count in b[side].items():
+            buckets[key] = buckets.get(key, 0) + count
+        merged[side] = buckets
+    return merged
+
+
+def sketch_quantile(sketch, q):
+    """Perkiraan kuantil q (0..1) dari sketsa, dengan galat relatif <= SKETCH_RELATIVE_ACCURACY."""
+    n = sketch['n']
+    if n == 0:
+        return np.nan
+    rank = q * (n - 1)
+    # Urutan naik: bucket negatif (indeks besar -> kecil), nol, lalu bucket positif
+    ordered = [(key, count, -1.0) for key, count in sorted(sketch['neg'].items(), reverse=True)]
+    ordered.append((0, sketch['zero'], 0.0))
+    ordered += [(key, count, 1.0) for key, count in sorted(sketch['pos'].items())]
+
+    seen = 0
+    for key, count, sign in ordered:
+        seen += count
+        if count and seen > rank:
+            # Nilai representatif bucket (titik tengah relatif ala DDSketch)
+            value = sign * 2 * _SKETCH_GAMMA ** key / (_SKETCH_GAMMA + 1)
+            return float(np.clip(value, sketch['min'], sketch['max']))
+    return sketch['max']
+
+
+def sketch_std(sketch):
+    """Simpangan baku sampel (ddof=1) dari M2 Welford."""
+    return float(np.sqrt(sketch['m2'] / (sketch['n'] - 1))) if sketch['n'] > 1 else np.nan
+
+
+def sketch_chunks(chunks, cols):
+    """Membangun sketsa per kolom dari iterable potongan DataFrame (mis. per stasiun atau
+    pd.read_csv(..., chunksize=...)), sehingga data tidak perlu dimuat utuh ke memori."""
+    sketches = {}
+    for chunk in chunks:
+        for col in cols:
+            part = column_sketch(chunk[col].to_numpy())
+            sketches[col] = merge_sketches(sketches[col], part) if col in sketches else part
+    return sketches
+
+
+def _sketch_to_json(sketch):
+    out = dict(sketch)
+    for side in ('pos', 'neg'):
+        out[side] = [list(sketch[side].keys()), list(sketch[side].values())]
+    return out
+
+
+def _sketch_from_json(data):
+    sketch = dict(data)
+    for side in ('pos', 'neg'):
+        keys, counts = data[side]
+        sketch[side] = dict(zip(keys, counts))
+    return sketch
+
+
+def load_summary_sketches(df, dataset_version, cols=tuple(NUMERIC_COLS)):
+    """Sketsa per kolom, dihitung per stasiun lalu digabung; disimpan di disk bersama versi dataset.
+
+    Seperti load_rollup_cube, `df` boleh berupa fungsi yang baru dipanggil saat cache tidak cocok.
+    """
+    try:
+        with open(STATS_CACHE_PATH) as f:
+            cached = json.load(f)
+        if cached.get('version') == dataset_version and set(cols) <= set(cached['sketches']):
+            return {col: _sketch_from_json(cached['sketches'][col]) for col in cols}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    chunks = (group for _, group in _materialize(df).groupby('station', sort=True, observed=True))
+    sketches = sketch_chunks(chunks, cols)
+    try:
+        _save_summary_sketches(sketches, dataset_version)
+    except OSError:
+        pass
+    return sketches
+
+
+def _save_summary_sketches(sketches, dataset_version):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = STATS_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({'version': dataset_version,
+                   'sketches': {col: _sketch_to_json(sk) for col, sk in sketches.items()}}, f)
+    os.replace(tmp_path, STATS_CACHE_PATH)
+
+
+def update_derived_caches(old_version, new_version, delta):
+    """Memajukan cube, statistik korelasi & sketsa statistik di disk dari `old_version` ke `new_version`
+    hanya dengan baris baru `delta`. Cache yang tidak berada di `old_version` dibiarkan (akan dibangun
+    ulang saat dipakai)."""
+    try:
+        cached = _load_pickle(CUBE_CACHE_PATH)
+        if cached is not None and cached.get('version') == old_version:
+            cube = merge_rollup_cubes(cached['cube'], build_rollup_cube(delta))
+            _save_pickle({'version': new_version, 'cube': cube}, CUBE_CACHE_PATH)
+
+        cached = _load_pickle(CORR_CACHE_PATH)
+        if cached is not None and cached.get('version') == old_version:
+            stats = cached['stats']
+            stats = merge_corr_stats(stats, build_corr_stats(delta, stats['cols'], shift=stats['shift']))
+            _save_pickle({'version': new_version, 'stats': stats}, CORR_CACHE_PATH)
+
+        with open(STATS_CACHE_PATH) as f:
+            cached = json.load(f)
+        if cached.get('version') == old_version:
+            sketches = {col: merge_sketches(_sketch_from_json(data), column_sketch(delta[col].to_numpy()))
+                        for col, data in cached['sketches'].items()}
+            _save_summary_sketches(sketches, new_version)
+    except (OSError, ValueError, KeyError):
+        pass
+
+
+# --- Korelasi dari statistik cukup per sel station x year x month (Pearson, pasangan lengkap) ---
+CORR_KEYS = ['station', 'year', 'month']
+CORR_CACHE_PATH = os.path.join(CACHE_DIR, "prsa_corr.pkl")
+# Bulan tiap musim di Beijing; None = semua bulan
+SEASONS = {
+    'Semua musim': None,
+    'Musim semi (Mar–Mei)': (3, 4, 5),
+    'Musim panas (Jun–Agu)': (6, 7, 8),
+    'Musim gugur (Sep–Nov)': (9, 10, 11),
+    'Musim dingin (Des–Feb)': (12, 1, 2),
+}
+
+
+def build_corr_stats(df, cols=NUMERIC_COLS, shift=None):
+    """Statistik cukup korelasi per sel CORR_KEYS. Untuk setiap pasangan kolom (i, j), dihitung atas
+    baris yang keduanya terisi: n = jumlah baris, s = Σx_i, q = Σx_i², p = Σx_i·x_j (array sel x k x k).
+
+    Nilai digeser `shift` (default: rata-rata kolom) sebelum dijumlah agar presisi float64 terjaga;
+    korelasi tidak berubah oleh pergeseran. Statistik yang akan digabung harus memakai shift yang sama.
+    """
+    cols = list(cols)
+    values = df[cols].to_numpy(dtype=np.float64)
+    if shift is None:
+        shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(cols))
+    valid = ~np.isnan(values)
+    x = np.where(valid, values - shift, 0.0)
+    m = valid.astype(np.float64)
+
+    group_ids = df.groupby(CORR_KEYS, observed=True, sort=True).ngroup().to_numpy()
+    order = np.argsort(group_ids, kind='stable')
+    bounds = np.flatnonzero(np.diff(group_ids[order])) + 1
+    stats = {key: [] for key in ('n', 's', 'q', 'p')}
+    for rows in np.split(order, bounds) if len(order) else []:
+        xg, mg = x[rows], m[rows]
+        stats['n'].append(mg.T @ mg)
+        stats['s'].append(xg.T @ mg)
+        stats['q'].append((xg ** 2).T @ mg)
+        stats['p'].append(xg.T @ xg)
+    keys = df[CORR_KEYS].iloc[order[np.r_[0, bounds]]] if len(order) else df[CORR_KEYS].iloc[:0]
+    return {
+        'cols': cols,
+        'shift': np.asarray(shift, dtype=np.float64),
+        'index': pd.MultiIndex.from_frame(keys.astype({'station': str})),
+        **{key: np.array(parts).reshape(-1, len(cols), len(cols)) for key, parts in stats.items()},
+    }
+
+
+def merge_corr_stats(a, b):
+    """Menggabungkan dua statistik korelasi (kolom & shift sama); sel yang sama dijumlahkan."""
+    codes, index = a['index'].append(b['index']).factorize(sort=True)
+    merged = {'cols': a['cols'], 'shift': a['shift'], 'index': index}
+    for key in ('n', 's', 'q', 'p'):
+        merged[key] = np.zeros((len(index),) + a[key].shape[1:])
+        np.add.at(merged[key], codes, np.concatenate([a[key], b[key]]))
+    return merged
+
+
+def load_corr_stats(df, dataset_version):
+    """Seperti load_rollup_cube: dari disk bila versinya cocok, selain itu dibangun (df boleh fungsi pemuat)."""
+    cached = _load_pickle(CORR_CACHE_PATH)
+    if cached is not None and cached.get('version') == dataset_version:
+        return cached['stats']
+    stats = build_corr_stats(_materialize(df))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _save_pickle({'version': dataset_version, 'stats': stats}, CORR_CACHE_PATH)
+    except OSError:
+        pass
+    return stats
+
+
+def correlate(stats, cols=None, **filters):
+    """Matriks korelasi Pearson (setara DataFrame.corr) untuk sel terpilih, hanya dengan menjumlahkan array.
+
+    `filters` membatasi sel seperti pada rollup, mis. correlate(stats, station='Dongsi', month=(12, 1, 2)).
+    """
+    mask = np.ones(len(stats['index']), dtype=bool)
+    for level, value in filters.items():
+        if value is not None:
+            mask &= stats['index'].get_level_values(level).isin(np.atleast_1d(value))
+    n, s, q, p = (stats[key][mask].sum(axis=0) for key in ('n', 's', 'q', 'p'))
+
+    cov = n * p - s * s.T
+    var = n * q - s ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+    r[n < 2] = np.nan
+    result = pd.DataFrame(r, index=stats['cols'], columns=stats['cols'])
+    return result if cols is None else result.loc[list(cols), list(cols)]
+
+
+def _lagged_sums(xs, ys, max_lag):
+    """Untuk lag 0..max_lag: n, Σx, Σy, Σx², Σy², Σxy atas pasangan (x[t], y[t - lag]) yang keduanya terisi.
+
+    Keenam jumlah adalah korelasi silang dua deret (mask/nilai/kuadrat), dihitung sekaligus lewat FFT.
+    """
+    mx, my = ~np.isnan(xs), ~np.isnan(ys)
+    x0, y0 = np.where(mx, xs, 0.0), np.where(my, ys, 0.0)
+    # Zero-padding >= panjang + max_lag agar korelasi sirkular tidak melingkar untuk lag yang diminta
+    nfft = 1 << int(np.ceil(np.log2(len(xs) + max_lag + 1)))
+    fa = np.fft.rfft(np.stack([mx, x0, mx, x0 ** 2, mx, x0]).astype(np.float64), nfft)
+    fb = np.fft.rfft(np.stack([my, my, y0, my, y0 ** 2, y0]).astype(np.float64), nfft)
+    sums = np.fft.irfft(fa * np.conj(fb), nfft)[:, :max_lag + 1]
+    sums[0] = np.rint(sums[0])
+    return sums
+
+
+def lagged_correlation(df, x, y, max_lag=48):
+    """Korelasi Pearson antara x(t) dan y(t - lag) untuk lag 0..max_lag jam (lag > 0: y mendahului x).
+
+    Tiap stasiun diletakkan pada grid per jam (jam yang tidak ada = kosong) sehingga pasangan tidak
+    pernah melintasi stasiun/celah; jumlah pasangan semua stasiun digabung sebelum Pearson dihitung.
+    Biaya O(n log n) lewat FFT, bukan O(n · max_lag).
+    """
+    shift_x, shift_y = np.nanmean(df[x].to_numpy(np.float64)), np.nanmean(df[y].to_numpy(np.float64))
+    totals = np.zeros((6, max_lag + 1))
+    for _, group in df.groupby('station', observed=True, sort=False):
+        times = group['datetime'].to_numpy()
+        pos = ((times - times.min()) // ONE_HOUR).astype(np.int64)
+        xs, ys = np.full((2, pos.max() + 1), np.nan)
+        xs[pos] = group[x].to_numpy(np.float64) - shift_x
+        ys[pos] = group[y].to_numpy(np.float64) - shift_y
+        totals += _lagged_sums(xs, ys, max_lag)
+
+    n, sx, sy, sxx, syy, sxy = totals
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+    r[n < 2] = np.nan
+    return pd.Series(np.clip(r, -1.0, 1.0), index=pd.RangeIndex(max_lag + 1, name='lag'), name='r')
+
+
+# --- Model LSTM: dimuat sekali per proses ---
+MODEL_PATH = "./model/pm25_lstm_model.keras"
+WINDOW_SIZE = 24
+FEATURE_COLS = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3']
+
+# Pengaturan thread TensorFlow untuk serving CPU (0 = biarkan TensorFlow yang menentukan)
+TF_INTRA_OP_THREADS = int(os.environ.get('PDSD_TF_INTRA_OP_THREADS', '0'))
+TF_INTER_OP_THREADS = int(os.environ.get('PDSD_TF_INTER_OP_THREADS', '0'))
+TF_CPU_ONLY = os.environ.get('PDSD_TF_CPU_ONLY', '0') == '1'
+
+
+def configure_tf_runtime(intra_op_threads=TF_INTRA_OP_THREADS, inter_op_threads=TF_INTER_OP_THREADS,
+                         cpu_only=TF_CPU_ONLY):
+    """Mengatur jumlah thread TensorFlow (dan opsional menonaktifkan GPU) sebelum model dimuat."""
+    import tensorflow as tf
+
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        if cpu_only:
+            tf.config.set_visible_devices([], 'GPU')
+    except RuntimeError:
+        # Runtime TensorFlow sudah terinisialisasi; pengaturan baru berlaku di proses berikutnya
+        pass
+
+
+def load_lstm_model(model_path=MODEL_PATH):
+    """Memuat & melakukan warm-up model Keras (TensorFlow baru di-import di sini)."""
+    from tensorflow.keras.models import load_model
+
+    configure_tf_runtime()
+    model = load_model(model_path, compile=False)
+    # Warm-up: membangun graph prediksi agar klik pertama pengguna tidak lambat
+    model.predict(np.zeros((1, WINDOW_SIZE, len(FEATURE_COLS)), dtype=np.float32), verbose=0)
+    return model
+
+
+# --- Backend inferensi ringan: forward pass LSTM murni NumPy (tanpa TensorFlow) ---
+# Bobot diekspor sekali dari file .keras ke .npz; serving cukup memakai NumPy.
+LEAN_MODEL_PATH = "./model/pm25_lstm_numpy.npz"
+INFERENCE_BACKENDS = ('numpy', 'keras')
+INFERENCE_BACKEND = os.environ.get('PDSD_INFERENCE_BACKEND', 'numpy')
+
+
+def _fused_lstm_weights(layer):
+    """Menyusun ulang gate Keras (i, f, c, o) menjadi (i, f, o, c) dan mengalikan kolom gate sigmoid
+    dengan 0.5, sehingga satu np.tanh untuk semua gate cukup: sigmoid(x) = 0.5 * tanh(0.5 * x) + 0.5."""
+    units = layer['recurrent_kernel'].shape[0]
+    order = np.r_[0:2 * units, 3 * units:4 * units, 2 * units:3 * units]
+    factor = np.r_[np.full(3 * units, 0.5), np.ones(units)].astype(np.float32)
+    return tuple(np.ascontiguousarray(layer[name][..., order] * factor, dtype=np.float32)
+                 for name in ('kernel', 'recurrent_kernel', 'bias'))
+
+
+class NumpyLSTMModel:
+    """Model Sequential LSTM/Dropout/Dense yang dijalankan dengan NumPy.
+
+    Antarmukanya meniru bagian Keras yang dipakai aplikasi: predict_on_batch, predict, output_shape.
+    """
+
+    def __init__(self, layers, source=None):
+        self.layers = layers
+        self.source = source or {}
+        self.output_shape = (None, layers[-1]['kernel'].shape[1])
+        self._fused = [_fused_lstm_weights(layer) if layer['type'] == 'lstm' else None for layer in layers]
+
+    def predict_on_batch(self, x):
+        h = np.asarray(x, dtype=np.float32)
+        for layer, fused in zip(self.layers, self._fused):
+            if layer['type'] == 'lstm':
+                h = self._lstm(h, fused, layer['return_sequences'])
+            else:
+                h = h @ layer['kernel'] + layer['bias']
+                if layer['activation'] == 'relu':
+                    h = np.maximum(h, 0)
+        return h
+
+    def predict(self, x, verbose=0, batch_size=None):
+        return self.predict_on_batch(x)
+
+    @staticmethod
+    def _lstm(x, fused, return_sequences):
+        """Satu layer LSTM Keras (aktivasi tanh/sigmoid) dengan bobot dari _fused_lstm_weights."""
+        kernel, recurrent_kernel, bias = fused
+        n, steps, _ = x.shape
+        units = recurrent_kernel.shape[0]
+        # Proyeksi input untuk semua langkah waktu sekaligus; loop hanya untuk bagian rekuren
+        x_proj = x @ kernel + bias
+        h = np.zeros((n, units), dtype=np.float32)
+        c = np.zeros((n, units), dtype=np.float32)
+        outputs = np.empty((n, steps, units), dtype=np.float32) if return_sequences else None
+        for t in range(steps):
+            z = np.tanh(x_proj[:, t] + h @ recurrent_kernel)
+            gates = z[:, :3 * units] * 0.5 + 0.5
+            c = gates[:, units:2 * units] * c + gates[:, :units] * z[:, 3 * units:]
+            h = gates[:, 2 * units:] * np.tanh(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+
+def _keras_layer_specs(model_path):
+    """Membaca arsitektur (config.json) & bobot (model.weights.h5) langsung dari arsip .keras."""
+    import h5py
+
+    with zipfile.ZipFile(model_path) as archive:
+        config = json.loads(archive.read('config.json'))
+        weights = h5py.File(io.BytesIO(archive.read('model.weights.h5')), 'r')
+    if config.get('class_name') != 'Sequential':
+        raise ValueError(f"Hanya model Sequential yang didukung, bukan {config.get('class_name')}")
+
+    specs, seen = [], {}
+    for layer in config['config']['layers']:
+        kind, cfg = layer['class_name'], layer['config']
+        # Keras menamai grup bobot menurut nama kelas: lstm, lstm_1, dense, ...
+        base = {'LSTM': 'lstm', 'Dense': 'dense'}.get(kind)
+        if kind in ('InputLayer', 'Dropout'):
+            continue
+        if base is None:
+            raise ValueError(f"Layer {kind} tidak didukung backend NumPy")
+        key = base if base not in seen else f"{base}_{seen[base]}"
+        seen[base] = seen.get(base, 0) + 1
+        if kind == 'LSTM':
+            if (cfg.get('activation') != 'tanh' or cfg.get('recurrent_activation') != 'sigmoid'
+                    or cfg.get('go_backwards') or cfg.get('stateful') or not cfg.get('use_bias', True)):
+                raise ValueError(f"Konfigurasi LSTM {cfg.get('name')} tidak didukung backend NumPy")
+            group = weights[f'layers/{key}/cell/vars']
+            specs.append({'type': 'lstm', 'kernel': group['0'][()], 'recurrent_kernel': group['1'][()],
+                          'bias': group['2'][()], 'return_sequences': bool(cfg.get('return_sequences'))})
+        else:
+            if cfg.get('activation') not in ('linear', 'relu') or not cfg.get('use_bias', True):
+                raise ValueError(f"Konfigurasi Dense {cfg.get('name')} tidak didukung backend NumPy")
+            group = weights[f'layers/{key}/vars']
+            specs.append({'type': 'dense', 'kernel': group['0'][()], 'bias': group['1'][()],
+                          'activation': cfg['activation']})
+    weights.close()
+    return specs
+
+
+def _model_source(model_path):
+    stat = os.stat(model_path)
+    return {'file': os.path.basename(model_path), 'size': stat.st_size, 'hash': _file_hash(model_path)}
+
+
+def export_numpy_model(model_path=MODEL_PATH, out_path=LEAN_MODEL_PATH):
+    """Mengekspor bobot model .keras ke .npz untuk NumpyLSTMModel (butuh h5py, tidak butuh TensorFlow)."""
+    specs = _keras_layer_specs(model_path)
+    arrays, meta = {}, []
+    for i, spec in enumerate(specs):
+        meta.append({k: v for k, v in spec.items() if not isinstance(v, np.ndarray)})
+        for name, value in spec.items():
+            if isinstance(value, np.ndarray):
+                arrays[f'{i}/{name}'] = value.astype(np.float32)
+    meta = {'layers': meta, 'source': _model_source(model_path)}
+    tmp_path = out_path + ".tmp.npz"
+    np.savez(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def load_numpy_model(lean_path=LEAN_MODEL_PATH):
+    with np.load(lean_path) as data:
+        meta = json.loads(str(data['meta']))
+        layers = []
+        for i, spec in enumerate(meta['layers']):
+            spec = dict(spec)
+            for key in data.files:
+                if key.startswith(f'{i}/'):
+                    spec[key.split('/', 1)[1]] = data[key]
+            layers.append(spec)
+    return NumpyLSTMModel(layers, meta['source'])
+
+
+def load_inference_model(backend=INFERENCE_BACKEND, model_path=MODEL_PATH, lean_path=LEAN_MODEL_PATH):
+    """Memuat model sesuai backend: 'numpy' (ringan) atau 'keras' (TensorFlow).
+
+    Untuk 'numpy', file .npz diekspor ulang dari `model_path` jika belum ada atau berasal dari
+    model yang berbeda (dibandingkan lewat ukuran & hash file).
+    """
+    if backend == 'keras':
+        return load_lstm_model(model_path)
+    if backend != 'numpy':
+        raise ValueError(f"Backend inferensi tidak dikenal: {backend}")
+    model = load_numpy_model(lean_path) if os.path.exists(lean_path) else None
+    if os.path.exists(model_path):
+        stat = os.stat(model_path)
+        if model is None or (model.source.get('size'), model.source.get('hash')) != (
+                stat.st_size, _file_hash(model_path)):
+            export_numpy_model(model_path, lean_path)
+            model = load_numpy_model(lean_path)
+    if model is None:
+        raise FileNotFoundError(f"Model tidak ditemukan: {model_path} / {lean_path}")
+    return model
+
+
+def model_artifacts(backend, model_path=MODEL_PATH, lean_path=LEAN_MODEL_PATH):
+    """File model yang ada di disk dan dipakai backend: .keras untuk 'keras'; untuk 'numpy' .keras
+    (sumber ekspor, opsional) dan .npz, sehingga replika ringan cukup membawa file .npz saja."""
+    paths = [model_path] + ([lean_path] if backend == 'numpy' else [])
+    return [path for path in paths if os.path.exists(path)]
+
+
+def serving_model_path(backend, model_path=MODEL_PATH, lean_path=LEAN_MODEL_PATH):
+    """File yang benar-benar dieksekusi backend (untuk sidik jari versi model)."""
+    return lean_path if backend == 'numpy' else model_path
+
+
+def backend_parity(reference, candidate, windows):
+    """Selisih absolut maksimum prediksi dua model (mis. Keras vs NumPy) pada jendela yang sama."""
+    return float(np.abs(predict_windows(reference, windows) - predict_windows(candidate, windows)).max())
+
+
+# --- Scaler Min-Max per stasiun: dihitung sekali, disimpan di samping model ---
+SCALER_PATH = "./model/pm25_scalers.json"
+
+
+def fit_station_scalers(df, feature_cols=FEATURE_COLS):
+    """Menghitung vektor min/max per stasiun (setara MinMaxScaler().fit pada data satu stasiun)."""
+    grouped = df.groupby('station', observed=True)[list(feature_cols)]
+    mins, maxs = grouped.min(), grouped.max()
+    return {
+        'feature_cols': list(feature_cols),
+        'stations': {
+            name: {'min': mins.loc[name].tolist(), 'max': maxs.loc[name].tolist()}
+            for name in mins.index
+        },
+    }
+
+
+def save_scaler_store(store, scaler_path=SCALER_PATH):
+    tmp_path = scaler_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(store, f, indent=1)
+    os.replace(tmp_path, scaler_path)
+
+
+def load_scaler_store(scaler_path=SCALER_PATH):
+    """Membaca store scaler dari JSON; None jika belum ada atau tidak terbaca."""
+    try:
+        with open(scaler_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_scaler_arrays(store):
+    """Mengubah store JSON menjadi array (n_stasiun, n_fitur) siap pakai untuk operasi vektor."""
+    names = sorted(store['stations'])
+    data_min = np.array([store['stations'][n]['min'] for n in names], dtype=np.float32)
+    data_max = np.array([store['stations'][n]['max'] for n in names], dtype=np.float32)
+    data_range = data_max - data_min
+    # Sama seperti sklearn: fitur konstan (range 0) diberi skala 1
+    data_range[data_range == 0] = 1.0
+    return {
+        'feature_cols': store['feature_cols'],
+        'index': {n: i for i, n in enumerate(names)},
+        'min': data_min,
+        'scale': 1.0 / data_range,
+    }
+
+
+def load_station_scalers(df, scaler_path=SCALER_PATH, stations=None):
+    """Memuat scaler per stasiun; hanya di-fit (lalu disimpan) jika file belum ada / tidak cocok.
+
+    Scaler adalah artefak pelatihan model, sehingga baris baru hasil append tidak mengubahnya.
+    Stasiun baru yang belum ada di file di-fit sendiri lalu ditambahkan; scaler stasiun lama tetap.
+    Semua stasiun di-fit ulang hanya jika file belum ada atau kolom fiturnya berbeda.
+    `df` boleh berupa fungsi yang baru dipanggil saat perlu fit; `stations` (default: stasiun
+    di `df`) adalah stasiun yang wajib ada di file scaler.
+    """
+    store = load_scaler_store(scaler_path)
+    if stations is None:
+        df = _materialize(df)
+        stations = df['station'].unique()
+    if store is None or store.get('feature_cols') != FEATURE_COLS:
+        store = fit_station_scalers(_materialize(df))
+    else:
+        missing = sorted(set(stations) - set(store.get('stations', {})))
+        if not missing:
+            return build_scaler_arrays(store)
+        df = _materialize(df)
+        store.setdefault('stations', {}).update(fit_station_scalers(df[df['station'].isin(missing)])['stations'])
+    try:
+        save_scaler_store(store, scaler_path)
+    except OSError:
+        pass
+    return build_scaler_arrays(store)
+
+
+def scaler_params(scalers, station):
+    """Mengambil (min, scale) milik satu stasiun."""
+    i = scalers['index'][station]
+    return scalers['min'][i], scalers['scale'][i]
+
+
+def scale_features(values, data_min, scale):
+    """Transformasi Min-Max secara vektor; mendukung bentuk (..., n_fitur)."""
+    return (values - data_min) * scale
+
+
+def unscale_pm25(values, data_min, scale):
+    """Inverse transform hanya untuk kolom PM2.5 (kolom pertama), tanpa array dummy."""
+    return values / scale[..., 0] + data_min[..., 0]
+
+
+# --- Indeks waktu per stasiun: array fitur kontigu + lookup aritmetika O(1) ---
+def build_station_arrays(df, feature_cols=FEATURE_COLS):
+    """Array fitur per stasiun (urut waktu, kontigu, float32) yang dibangun sekali saat load.
+
+    Untuk deret per jam tanpa celah, posisi suatu waktu cukup dihitung dari selisihnya terhadap
+    jam pertama; flag 'regular' menandai apakah asumsi itu berlaku.
+    """
+    arrays = {}
+    for station, df_station in df.groupby('station', sort=True, observed=True):
+        df_station = df_station.sort_values('datetime')
+        times = df_station['datetime'].to_numpy()
+        arrays[station] = {
+            'times': times,
+            'values': np.ascontiguousarray(df_station[list(feature_cols)].to_numpy(dtype=np.float32)),
+            'regular': bool(len(times) < 2 or (np.diff(times) == ONE_HOUR).all()),
+        }
+    return arrays
+
+
+def load_station_arrays(catalog, stations=None, feature_cols=FEATURE_COLS):
+    """Array per stasiun seperti build_station_arrays. Dengan salinan bersama, 'times' dan 'values'
+    berupa view read-only ke file yang di-memory-map sehingga tidak ada salinan per proses."""
+    shared = catalog.get('shared')
+    if shared is None or list(feature_cols) != FEATURE_COLS:
+        df = read_partitions(catalog, stations=stations, columns=['station', 'datetime', *feature_cols])
+        return build_station_arrays(df, feature_cols)
+
+    times_all = shared['table'].column('datetime').chunk(0).to_numpy(zero_copy_only=True)
+    rows = {}
+    for part in catalog['parts']:
+        rows[part['station']] = rows.get(part['station'], 0) + part['rows']
+    arrays, start = {}, 0
+    for station in catalog['stations']:
+        n_rows = rows.get(station, 0)
+        if n_rows and (stations is None or station in stations):
+            times = times_all[start:start + n_rows]
+            arrays[station] = {
+                'times': times,
+                'values': shared['features'][start:start + n_rows],
+                'regular': bool(n_rows < 2 or (np.diff(times) == ONE_HOUR).all()),
+            }
+        start += n_rows
+    return arrays
+
+
+def locate_time(series, target_time):
+    """Posisi baris untuk `target_time` pada satu deret stasiun, atau None jika tidak ada."""
+    target = np.datetime64(pd.Timestamp(target_time), 'ns')
+    times = series['times']
+    if len(times) == 0:
+        return None
+    if series['regular']:
+        offset = target - times[0]
+        pos = int(offset // ONE_HOUR)
+        if offset % ONE_HOUR != np.timedelta64(0) or not 0 <= pos < len(times):
+            return None
+        return pos
+    pos = int(np.searchsorted(times, target))
+    return pos if pos < len(times) and times[pos] == target else None
+
+
+def station_time_bounds(arrays):
+    """(waktu paling awal, waktu paling akhir) di seluruh stasiun tanpa memindai DataFrame."""
+    first = min(series['times'][0] for series in arrays.values())
+    last = max(series['times'][-1] for series in arrays.values())
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+
+def input_window(series, pos):
+    """Jendela input WINDOW_SIZE jam sebelum posisi `pos` (view, tanpa salinan); None jika kurang."""
+    if pos is None or pos < WINDOW_SIZE:
+        return None
+    return series['values'][pos - WINDOW_SIZE:pos]
+
+
+# --- Prediksi batch: banyak stasiun & banyak jam sekaligus ---
+PREDICT_BATCH_SIZE = 4096
+
+
+def predict_windows(model, windows, batch_size=PREDICT_BATCH_SIZE):
+    """Menjalankan model pada array jendela (n, WINDOW_SIZE, n_fitur) dalam potongan batch besar.
+
+    `windows` boleh berupa view (hasil sliding_window_view); salinan hanya dibuat per potongan.
+    """
+    preds = np.empty(len(windows), dtype=np.float32)
+    with stage('lstm_inference', rows=len(windows)):
+        for start in range(0, len(windows), batch_size):
+            chunk = np.ascontiguousarray(windows[start:start + batch_size], dtype=np.float32)
+            preds[start:start + len(chunk)] = np.asarray(model.predict_on_batch(chunk)).reshape(-1)
+    return preds
+
+
+def station_windows(values_scaled):
+    """Semua jendela 24 jam dari array fitur (n, n_fitur) yang sudah urut waktu, tanpa menyalin data.
+
+    Jendela ke-i berisi baris i .. i+WINDOW_SIZE-1 dan memprediksi baris i+WINDOW_SIZE.
+    """
+    return sliding_window_view(values_scaled[:-1], WINDOW_SIZE, axis=0).transpose(0, 2, 1)
+
+
+def predict_batch(model, arrays, scalers, stations=None, start=None, end=None, batch_size=PREDICT_BATCH_SIZE):
+    """Prediksi PM2.5 satu jam ke depan untuk setiap jam target di rentang [start, end] pada tiap stasiun.
+
+    `arrays` adalah hasil build_station_arrays. Mengembalikan DataFrame rapi berkolom:
+    station, datetime, actual, predicted, error.
+    """
+    parts = []
+    for station in sorted(stations if stations is not None else arrays):
+        if station not in arrays:
+            continue
+        times = arrays[station]['times']
+        values = arrays[station]['values']
+
+        # Posisi target valid: WINDOW_SIZE .. n-1, dibatasi rentang waktu yang diminta
+        lo = WINDOW_SIZE
+        if start is not None:
+            lo = max(lo, int(np.searchsorted(times, np.datetime64(pd.Timestamp(start)), side='left')))
+        hi = len(times)
+        if end is not None:
+            hi = min(hi, int(np.searchsorted(times, np.datetime64(pd.Timestamp(end)), side='right')))
+        if hi <= lo:
+            continue
+
+        data_min, scale = scaler_params(scalers, station)
+        values_scaled = scale_features(values[lo - WINDOW_SIZE:hi], data_min, scale)
+        pred_scaled = predict_windows(model, station_windows(values_scaled), batch_size)
+
+        actual = values[lo:hi, 0]
+        predicted = unscale_pm25(pred_scaled, data_min, scale)
+        parts.append(pd.DataFrame({
+            'station': station,
+            'datetime': times[lo:hi],
+            'actual': actual,
+            'predicted': predicted,
+            'error': predicted - actual,
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=['station', 'datetime', 'actual', 'predicted', 'error'])
+    return pd.concat(parts, ignore_index=True)
+
+
+# --- Prakiraan multi-langkah (horizon > 1 jam) ---
+FORECAST_HORIZONS = [1, 6, 24, 72]
+
+
+def forecast_recursive(model, windows_scaled, horizon):
+    """Rollout rekursif untuk banyak deret sekaligus.
+
+    `windows_scaled` berbentuk (n_deret, WINDOW_SIZE, n_fitur). Jendela disimpan dalam ring buffer
+    yang ditulis ganda (panjang 2 x WINDOW_SIZE) sehingga setiap langkah hanya menulis satu baris dan
+    jendela aktif selalu berupa potongan kontigu — waktu & memori per langkah konstan.
+    Fitur selain PM2.5 diasumsikan persisten (nilai terakhir yang teramati).
+    Mengembalikan prediksi PM2.5 terskala berbentuk (n_deret, horizon).
+    """
+    n_series, window, n_features = windows_scaled.shape
+    ring = np.empty((n_series, 2 * window, n_features), dtype=np.float32)
+    ring[:, :window] = windows_scaled
+    ring[:, window:] = windows_scaled
+    next_row = np.array(windows_scaled[:, -1, :], dtype=np.float32)
+
+    preds = np.empty((n_series, horizon), dtype=np.float32)
+    head = 0
+    for step in range(horizon):
+        y = np.asarray(model.predict_on_batch(ring[:, head:head + window])).reshape(-1)
+        preds[:, step] = y
+
+        # Baris terlama (posisi head) diganti prediksi baru di kedua salinan ring
+        next_row[:, 0] = y
+        ring[:, head] = next_row
+        ring[:, head + window] = next_row
+        head = (head + 1) % window
+    return preds
+
+
+def forecast_direct(model, windows_scaled, horizon):
+    """Strategi direct: satu panggilan model untuk seluruh horizon (butuh model ber-output >= horizon)."""
+    preds = np.asarray(model.predict_on_batch(np.ascontiguousarray(windows_scaled, dtype=np.float32)))
+    return preds.reshape(len(windows_scaled), -1)[:, :horizon]
+
+
+def supports_direct(model, horizon):
+    """True jika lapisan output model cukup lebar untuk strategi direct."""
+    return model.output_shape[-1] >= horizon
+
+
+def forecast_stations(model, arrays, scalers, target_time, horizon, stations=None, strategy='recursive'):
+    """Prakiraan PM2.5 `horizon` jam mulai `target_time` untuk banyak stasiun dalam satu batch.
+
+    Mengembalikan DataFrame rapi berkolom: station, step, datetime, predicted, actual.
+    """
+    target = np.datetime64(pd.Timestamp(target_time), 'ns')
+
+    names, windows, mins, scales, actuals = [], [], [], [], []
+    for station in sorted(stations if stations is not None else arrays):
+        if station not in arrays:
+            continue
+        series = arrays[station]
+        pos = locate_time(series, target)
+        window = input_window(series, pos)
+        if window is None:
+            continue
+
+        values = series['values']
+        data_min, scale = scaler_params(scalers, station)
+        future = np.full(horizon, np.nan, dtype=np.float32)
+        observed = values[pos:pos + horizon, 0]
+        future[:len(observed)] = observed
+
+        names.append(station)
+        windows.append(scale_features(window, data_min, scale))
+        mins.append(data_min)
+        scales.append(scale)
+        actuals.append(future)
+
+    if not names:
+        return pd.DataFrame(columns=['station', 'step', 'datetime', 'predicted', 'actual'])
+
+    windows = np.stack(windows)
+    with stage('lstm_forecast', rows=len(windows) * horizon):
+        if strategy == 'direct':
+            pred_scaled = forecast_direct(model, windows, horizon)
+        else:
+            pred_scaled = forecast_recursive(model, windows, horizon)
+    predicted = unscale_pm25(pred_scaled, np.stack(mins)[:, None, :], np.stack(scales)[:, None, :])
+
+    steps = np.arange(1, horizon + 1)
+    return pd.DataFrame({
+        'station': np.repeat(names, horizon),
+        'step': np.tile(steps, len(names)),
+        'datetime': np.tile(target + (steps - 1) * np.timedelta64(1, 'h'), len(names)),
+        'predicted': predicted.reshape(-1),
+        'actual': np.concatenate(actuals),
+    })
+
+
+# --- Data grafik ringkas: statistik box plot & downsampling deret waktu di sisi server ---
+# Jumlah titik maksimum per garis (kira-kira lebar grafik dalam piksel) dan outlier per kotak
+PLOT_MAX_POINTS = 1500
+BOX_MAX_OUTLIERS = 200
+
+
+def box_stats(df, by, col, max_outliers=BOX_MAX_OUTLIERS):
+    """Statistik box plot per kelompok `by` untuk kolom `col` (kuartil, pagar 1.5 IQR, mean, outlier).
+
+    Outlier dibatasi `max_outliers` per kelompok: diambil merata dari outlier yang sudah diurutkan
+    sehingga nilai paling ekstrem selalu ikut. Mengembalikan DataFrame satu baris per kelompok.
+    """
+    rows = []
+    for name, values in df.groupby(by, observed=True, sort=True)[col]:
+        values = np.sort(values.to_numpy(dtype=np.float64))
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        # Ujung whisker = nilai data terjauh yang masih di dalam 1.5 IQR (konvensi Plotly/Tukey)
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        outliers = values[(values < inside[0]) | (values > inside[-1])]
+        if len(outliers) > max_outliers:
+            outliers = outliers[np.unique(np.linspace(0, len(outliers) - 1, max_outliers).round().astype(int))]
+        rows.append({
+            by: name, 'n': len(values), 'mean': values.mean(),
+            'q1': q1, 'median': median, 'q3': q3,
+            'lowerfence': inside[0], 'upperfence': inside[-1], 'outliers': outliers,
+        })
+    return pd.DataFrame(rows)
+
+
+def lttb_indices(x, y, n_out):
+    """Indeks titik terpilih dengan Largest-Triangle-Three-Buckets; bentuk garis (puncak/lembah)
+    tetap terjaga. `x` numerik & urut naik, tanpa NaN."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Batas bucket untuk titik 1 .. n-2 (titik pertama & terakhir selalu dipakai)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Titik acuan: rata-rata bucket berikutnya (atau titik terakhir)
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def minmax_indices(y, n_out):
+    """Indeks titik minimum & maksimum per bucket (vektor, sangat cepat; menjaga semua lonjakan)."""
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    y = np.asarray(y, dtype=np.float64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.r_[starts, n]))
+    order = np.lexsort((y, bucket))
+    first = np.r_[0, np.flatnonzero(np.diff(bucket[order])) + 1]
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.r_[order[first], order[last]])
+
+
+def downsample(df, x, cols, max_points=PLOT_MAX_POINTS, method='lttb', by=None):
+    """Format panjang (by, x, variable, value) dengan paling banyak `max_points` titik per garis.
+
+    Cocok langsung untuk px.line(..., x=x, y='value', color='variable').
+    method: 'lttb' (bentuk garis terjaga) atau 'minmax' (semua puncak terjaga, lebih cepat).
+    """
+    groups = df.groupby(by, observed=True, sort=True) if by is not None else [(None, df)]
+    parts = []
+    for name, group in groups:
+        xs = group[x].to_numpy()
+        x_num = xs.astype(np.int64) if np.issubdtype(xs.dtype, np.datetime64) else xs
+        for col in cols:
+            ys = group[col].to_numpy()
+            valid = np.flatnonzero(~np.isnan(ys))
+            if method == 'lttb':
+                keep = valid[lttb_indices(x_num[valid], ys[valid], max_points)]
+            else:
+                keep = valid[minmax_indices(ys[valid], max_points)]
+            part = pd.DataFrame({x: xs[keep], 'variable': col, 'value': ys[keep]})
+            if by is not None:
+                part.insert(0, by, name)
+            parts.append(part)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=[x, 'variable', 'value'])
+
+
+def heatmap_png(data, annot, fmt, cmap, title=None, xlabel=None, ylabel=None, figsize=(10, 5), cbar_label=None,
+                linewidths=0, dpi=100):
+    """Render heatmap seaborn ke byte PNG (matplotlib/seaborn di-import saat pertama dipakai).
+
+    Figure dibuat lewat matplotlib.figure.Figure (bukan pyplot) sehingga tidak masuk registry global
+    pyplot dan langsung dibebaskan setelah disimpan; memori proses tidak bertambah setiap rerun.
+    """
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.heatmap(data, annot=annot, fmt=fmt, cmap=cmap, ax=ax, linewidths=linewidths,
+                cbar_kws={'label': cbar_label} if cbar_label else None)
+    if title:
+        ax.set_title(title)
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi)
+    fig.clear()
+    return buffer.getvalue()
+
+
+# --- Data marker peta stasiun (vektor; dirender sebagai satu layer GeoJSON) ---
+MAP_COLORS = ['green', 'yellow', 'orange', 'red']
+# Batas warna tetap untuk PM2.5 (µg/m³); polutan lain memakai kuartil antar stasiun
+MAP_LEVELS = {'PM2.5': [50, 100, 150]}
+MAP_POPUP_COLS = ['PM2.5', 'PM10', 'SO2']
+
+
+def station_map_features(stats, value_col, coords=STATION_COORDS):
+    """Properti marker untuk setiap stasiun: lat, lon, warna, radius, dan HTML popup.
+
+    `stats` berisi kolom 'station' dan kolom polutan (mis. hasil rollup per stasiun). Stasiun tanpa
+    koordinat diabaikan. Semua kolom dihitung sekaligus tanpa loop per baris.
+    """
+    known = stats['station'].astype(str).isin(list(coords))
+    stats = stats[known].reset_index(drop=True)
+    station = stats['station'].astype(str)
+    latlon = np.array([coords[name] for name in station], dtype=np.float64).reshape(-1, 2)
+    values = stats[value_col].to_numpy(dtype=np.float64)
+
+    levels = MAP_LEVELS.get(value_col)
+    if levels is None:
+        levels = np.nanquantile(values, [0.25, 0.5, 0.75]) if len(values) else [0, 0, 0]
+    color = np.asarray(MAP_COLORS)[np.searchsorted(levels, values, side='left')]
+    # PM2.5 memakai ukuran asli (10 + nilai/10); polutan lain diskalakan terhadap rata-rata antar stasiun
+    radius = 10 + (values / 10 if value_col == 'PM2.5' else 10 * values / max(np.nanmean(values), 1e-9))
+
+    popup = '<b>' + station + '</b>'
+    for col in dict.fromkeys(MAP_POPUP_COLS + [value_col]):
+        popup = popup + f'<br>{col}: ' + stats[col].map('{:.2f}'.format)
+    return pd.DataFrame({
+        'station': station, 'lat': latlon[:, 0], 'lon': latlon[:, 1], 'value': values,
+        'color': color, 'radius': np.nan_to_num(radius, nan=10.0), 'popup': popup,
+    })
+
+
+def features_to_geojson(features):
+    """FeatureCollection GeoJSON (titik) dari hasil station_map_features."""
+    props = features.drop(columns=['lat', 'lon']).to_dict('records')
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]}, 'properties': prop}
+            for lon, lat, prop in zip(features['lon'].tolist(), features['lat'].tolist(), props)
+        ],
+    }
+
+
+# --- Cache hasil prediksi bersama (LRU + TTL, opsional disimpan di SQLite) ---
+PREDICTION_CACHE_SIZE = int(os.environ.get('PDSD_PREDICTION_CACHE_SIZE', '1024'))
+# Umur maksimum entri dalam detik (0 = tidak kedaluwarsa; kunci sudah memuat versi model & dataset)
+PREDICTION_CACHE_TTL = float(os.environ.get('PDSD_PREDICTION_CACHE_TTL', '0'))
+# Path SQLite untuk cache di disk (kosong = hanya memori)
+PREDICTION_CACHE_PATH = os.environ.get('PDSD_PREDICTION_CACHE_PATH', '')
+
+
+def model_version(model_path=MODEL_PATH):
+    """Sidik jari isi file model; berubah setiap kali file model diganti."""
+    return f"{os.path.getsize(model_path)}-{_file_hash(model_path)}"
+
+
+class PredictionCache:
+    """Cache hasil prediksi yang dipakai bersama oleh semua sesi/thread dalam satu proses.
+
+    Entri di memori dibatasi `max_entries` (LRU) dan `ttl` detik. Jika `path` diisi, setiap entri
+    juga ditulis ke SQLite (dibatasi `disk_max_entries`) sehingga tetap ada setelah restart dan bisa
+    dipakai bersama beberapa replika pada disk yang sama.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL, path=PREDICTION_CACHE_PATH,
+                 disk_max_entries=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries or max_entries * 16
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS predictions "
+                             "(key TEXT PRIMARY KEY, value BLOB, created REAL, accessed REAL)")
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(key, default=str)
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, key, default=None):
+        key, now = self._key(key), time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._entries.move_to_end(key)
+                self._counts['hits'] += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute("UPDATE predictions SET accessed = ? WHERE key = ?", (now, key))
+                    value = pickle.loads(row[0])
+                    self._store(key, value, row[1])
+                    self._counts['disk_hits'] += 1
+                    return value
+            self._counts['misses'] += 1
+            return default
+
+    def put(self, key, value):
+        key, now = self._key(key), time.time()
+        with self._lock:
+            self._store(key, value, now)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                                 (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now, now))
+                # Buang entri yang paling lama tidak diakses jika melebihi batas
+                self._db.execute("DELETE FROM predictions WHERE key IN (SELECT key FROM predictions "
+                                 "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.disk_max_entries,))
+
+    def _store(self, key, value, created):
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counts['evictions'] += 1
+
+    def get_or_compute(self, key, compute):
+        """Nilai dari cache, atau hasil `compute()` yang langsung disimpan (tanpa kunci selama komputasi)."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, entries=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+
+
+# --- Klasifikasi AQI PM2.5 (vektor, tanpa apply per baris) ---
+AQI_CATEGORIES = [
+    "🟢 Baik", "🟡 Sedang", "🟠 Tidak Sehat (Sensitif)",
+    "🔴 Tidak Sehat", "🟣 Sangat Tidak Sehat", "🟤 Berbahaya",
+]
+# Batas atas PM2.5 (µg/m³) tiap kategori, sesuai tabel AQI; kategori terakhir tanpa batas atas
+AQI_PM25_UPPER = np.array([12.0, 35.4, 55.4, 150.4, 250.4])
+
+
+def aqi_codes(pm25):
+    """Kode kategori AQI (0..5) untuk array PM2.5; -1 untuk nilai kosong."""
+    pm25 = np.asarray(pm25)
+    if not np.issubdtype(pm25.dtype, np.floating):
+        pm25 = pm25.astype(np.float64)
+    # Batas dibandingkan dalam presisi yang sama dengan data (mis. float32 35.4 tetap "Sedang")
+    codes = np.searchsorted(AQI_PM25_UPPER.astype(pm25.dtype), pm25, side='left')
+    codes[np.isnan(pm25)] = -1
+    return codes
+
+
+def classify_aqi(pm25):
+    """Kategori AQI sebagai categorical berurutan (Baik < ... < Berbahaya)."""
+    return pd.Categorical.from_codes(aqi_codes(pm25), categories=AQI_CATEGORIES, ordered=True)
+
+
+def aqi_distribution(df):
+    """Distribusi kategori AQI keseluruhan & per tahun dihitung dengan bincount.
+
+    Mengembalikan (aqi_counts, aqi_yearly_pct) siap ditampilkan.
+    """
+    with stage('classify_aqi', rows=len(df)):
+        codes = aqi_codes(df['PM2.5'].to_numpy())
+    valid = codes >= 0
+    codes = codes[valid]
+    n_cat = len(AQI_CATEGORIES)
+
+    counts = np.bincount(codes, minlength=n_cat)
+    aqi_counts = pd.DataFrame({
+        'Kategori': pd.Categorical(AQI_CATEGORIES, categories=AQI_CATEGORIES, ordered=True),
+        'Jumlah Jam': counts,
+    })
+    aqi_counts['Persentase (%)'] = (aqi_counts['Jumlah Jam'] / max(counts.sum(), 1) * 100).round(1)
+
+    years, year_idx = np.unique(df['year'].to_numpy()[valid], return_inverse=True)
+    yearly = np.bincount(year_idx * n_cat + codes, minlength=len(years) * n_cat).reshape(len(years), n_cat)
+    total_per_year = yearly.sum(axis=1, keepdims=True)
+    aqi_yearly_pct = pd.DataFrame({
+        'year': np.repeat(years.astype(int), n_cat),
+        'Kategori AQI': pd.Categorical(np.tile(AQI_CATEGORIES, len(years)),
+                                       categories=AQI_CATEGORIES, ordered=True),
+        'Jumlah Jam': yearly.reshape(-1),
+        'Persentase (%)': (yearly / np.maximum(total_per_year, 1) * 100).round(1).reshape(-1),
+    })
+    return aqi_counts, aqi_yearly_pct
@@ -0,0 +1,78 @@
+"""Mengekspor model LSTM .keras menjadi artefak inferensi ringan (.npz) dan memeriksa paritasnya.
+
+Contoh:
+    python tubes_export.py                 # ekspor + cek paritas terhadap Keras
+    python tubes_export.py --skip-check    # ekspor saja (tanpa TensorFlow)
+
+Pemeriksaan paritas menjalankan kedua backend pada jendela 24 jam dari dataset (ditambah jendela
+acak dalam rentang [0, 1]) dan gagal (exit code 1) jika selisih melebihi --atol.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from tubes_core import (
+    MODEL_PATH, LEAN_MODEL_PATH, WINDOW_SIZE, FEATURE_COLS,
+    export_numpy_model, load_numpy_model, load_lstm_model, backend_parity,
+    load_dataset, build_station_arrays, load_station_scalers, scaler_params, scale_features, station_windows,
+)
+
+
+def sample_windows(n_samples, seed=0):
+    """Jendela terskala dari dataset asli (jika tersedia) ditambah jendela acak."""
+    rng = np.random.default_rng(seed)
+    windows = [rng.random((n_samples, WINDOW_SIZE, len(FEATURE_COLS)), dtype=np.float32)]
+    try:
+        df = load_dataset(columns=['station', 'datetime', *FEATURE_COLS])
+    except FileNotFoundError:
+        return windows[0]
+    scalers = load_station_scalers(df)
+    for station, series in build_station_arrays(df).items():
+        data_min, scale = scaler_params(scalers, station)
+        all_windows = station_windows(scale_features(series['values'], data_min, scale))
+        picks = rng.choice(len(all_windows), size=min(n_samples, len(all_windows)), replace=False)
+        windows.append(all_windows[np.sort(picks)])
+    windows = np.concatenate(windows)
+    return windows[~np.isnan(windows).any(axis=(1, 2))]
+
+
+def single_window_latency(model, window, repeat=200):
+    """Median latensi (ms) prediksi satu jendela."""
+    model.predict_on_batch(window)
+    timings = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        model.predict_on_batch(window)
+        timings.append(time.perf_counter() - t_start)
+    return float(np.median(timings) * 1e3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor model LSTM ke backend NumPy & cek paritas dengan Keras.")
+    parser.add_argument('--model', default=MODEL_PATH, help="path model .keras")
+    parser.add_argument('--out', default=LEAN_MODEL_PATH, help="path output .npz")
+    parser.add_argument('--samples', type=int, default=2000, help="jumlah jendela per stasiun untuk cek paritas")
+    parser.add_argument('--atol', type=float, default=1e-5, help="selisih absolut maksimum yang diizinkan")
+    parser.add_argument('--skip-check', action='store_true', help="hanya ekspor, tanpa memuat TensorFlow")
+    args = parser.parse_args(argv)
+
+    export_numpy_model(args.model, args.out)
+    lean = load_numpy_model(args.out)
+    print(f"Diekspor ke {args.out} ({len(lean.layers)} layer berbobot)")
+    if args.skip_check:
+        return
+
+    keras_model = load_lstm_model(args.model)
+    windows = sample_windows(args.samples)
+    max_diff = backend_parity(keras_model, lean, windows)
+    print(f"Paritas pada {len(windows):,} jendela: selisih maksimum {max_diff:.3g} (atol {args.atol:g})")
+    for name, model in (('numpy', lean), ('keras', keras_model)):
+        print(f"Latensi 1 jendela [{name}]: {single_window_latency(model, windows[:1]):.3f} ms")
+    if not max_diff <= args.atol:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
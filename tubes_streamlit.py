@@ -1,20 +1,29 @@
+import time
+
+# Waktu mulai script dicatat sebelum import apa pun agar biaya startup ikut terukur
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from tensorflow.keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
-import folium
-from streamlit_folium import st_folium
 
 import os
-
-# --- Mengatasi error mutex/lock pada macOS ---
-os.environ['KMP_DUPLICATE_LIB_OK'] = 'True'
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+import json
+import datetime
+
+from tubes_core import (
+    STATION_COORDS, MODEL_PATH, SCALER_PATH, WINDOW_SIZE, FEATURE_COLS, NUMERIC_COLS, FORECAST_HORIZONS,
+    find_csv_files, source_signature, sync_cache, map_shared_dataset, read_partitions,
+    CUBE_KEYS, load_rollup_cube, rollup, load_summary_sketches, sketch_quantile,
+    CORR_KEYS, SEASONS, load_corr_stats, correlate, lagged_correlation,
+    INFERENCE_BACKENDS, INFERENCE_BACKEND, load_inference_model, model_artifacts, serving_model_path,
+    model_version, PredictionCache,
+    load_station_scalers, scaler_params, scale_features, unscale_pm25,
+    load_station_arrays, locate_time, station_time_bounds, input_window,
+    predict_batch, forecast_stations, supports_direct, aqi_distribution,
+    BOX_MAX_OUTLIERS, box_stats, downsample, heatmap_png, station_map_features, features_to_geojson,
+    PROFILE_METRICS, start_profile, finish_profile, stage, cache_miss, profiled,
+)
 
 # ==========================================
 # 1. KONFIGURASI HALAMAN & JUDUL
@@ -49,59 +58,369 @@ st.markdown("""
 # 2. DATA LOADING & PREPROCESSING
 # ==========================================
 
-# Koordinat Stasiun (Geo-Analysis Data)
-STATION_COORDS = {
-    "Aotizhongxin": [39.982, 116.397],
-    "Changping": [40.217, 116.230],
-    "Dingling": [40.292, 116.220],
-    "Dongsi": [39.929, 116.417],
-    "Guanyuan": [39.929, 116.339],
-    "Gucheng": [39.914, 116.184],
-    "Huairou": [40.328, 116.628],
-    "Nongzhanguan": [39.937, 116.461],
-    "Shunyi": [40.127, 116.655],
-    "Tiantan": [39.886, 116.407],
-    "Wanliu": [39.987, 116.287],
-    "Wanshouxigong": [39.878, 116.352]
-}
+# Logika data/statistik/model ada di tubes_core.py; di sini hanya dibungkus cache Streamlit
+# agar hasilnya dipakai bersama oleh semua sesi. Script hanya memegang katalog dataset (metadata
+# partisi year/station); setiap tampilan membaca partisi & kolom yang dibutuhkannya saja. Library berat (matplotlib/seaborn, plotly,
+# folium, TensorFlow) baru di-import di halaman yang membutuhkannya; Python menyimpan modul
+# yang sudah di-import sehingga rerun berikutnya tidak membayar biaya itu lagi.
+# Setiap fungsi ber-cache juga tercatat sebagai tahap profil rerun (hit/miss, durasi, delta memori);
+# cache_miss() di awal isi fungsi hanya berjalan ketika cache Streamlit benar-benar menghitung ulang.
 
-@st.cache_data
-def load_data():
-    """Memuat semua file CSV PRSA Data dari direktori saat ini."""
-    csv_files = []
-    for root, dirs, files in os.walk("."):
-        for file in files:
-            if file.endswith(".csv"):
-                csv_files.append(os.path.join(root, file))
+
+@profiled('catalog', cache=True)
+@st.cache_resource(max_entries=1)
+def _load_catalog_cached(csv_files, signature):
+    # Data dibaca dari salinan bersama yang di-memory-map: satu salinan fisik per host untuk semua
+    # sesi dan proses server, tanpa deserialisasi per sesi
+    cache_miss()
+    return map_shared_dataset(sync_cache(list(csv_files)))
+
+
+def load_catalog():
+    """Menyelaraskan cache dataset PRSA (lihat tubes_core.sync_cache) dan mengembalikan katalognya,
+    atau None jika CSV tidak ditemukan."""
+    csv_files = find_csv_files()
 
     if not csv_files:
-        st.error("Dataset tidak ditemukan! Pastikan file CSV (PRSA_Data_...) berada di folder yang sama.")
-        return pd.DataFrame()
+        st.error("Dataset tidak ditemukan! Pastikan file CSV (PRSA_Data_...) berada di folder dataset.")
+        return None
+
+    # Kunci cache murah (hanya os.stat) agar file baru/bertambah terdeteksi di rerun berikutnya
+    return _load_catalog_cached(tuple(csv_files), source_signature(csv_files))
+
+
+@profiled('rollup_cube', cache=True)
+@st.cache_resource(max_entries=2)
+def get_rollup_cube(_catalog, dataset_version):
+    """Cube dibangun sekali per versi dataset lalu dipakai bersama oleh semua sesi."""
+    cache_miss()
+    return load_rollup_cube(lambda: read_partitions(_catalog, columns=CUBE_KEYS + NUMERIC_COLS), dataset_version)
+
+
+@profiled('summary_sketches', cache=True)
+@st.cache_resource(max_entries=2)
+def get_summary_sketches(_catalog, dataset_version, cols=tuple(NUMERIC_COLS)):
+    cache_miss()
+    return load_summary_sketches(lambda: read_partitions(_catalog, columns=['station', *cols]), dataset_version, cols)
+
+
+@profiled('aqi_distribution', cache=True)
+@st.cache_data(max_entries=2)
+def get_aqi_distribution(_catalog, dataset_version):
+    """Distribusi AQI hanya membaca kolom year & PM2.5 dari semua partisi, sekali per versi dataset."""
+    cache_miss()
+    return aqi_distribution(read_partitions(_catalog, columns=['year', 'PM2.5']))
+
+
+@profiled('model_load', cache=True)
+@st.cache_resource(max_entries=2, show_spinner="Memuat model LSTM...")
+def _load_model_cached(model_path, mtime_ns, backend):
+    """mtime_ns (semua file model backend) ikut menjadi kunci cache sehingga model hanya dimuat ulang
+    ketika salah satu file berubah."""
+    cache_miss()
+    return load_inference_model(backend, model_path)
+
+
+def get_model(model_path=MODEL_PATH, backend=INFERENCE_BACKEND):
+    """Mengambil model dari registry proses (hot-reload hanya jika mtime file model backend berubah).
+    Backend 'numpy' cukup dengan file .npz; .keras hanya dibutuhkan sebagai sumber ekspor ulang."""
+    mtimes = tuple(os.stat(path).st_mtime_ns for path in model_artifacts(backend, model_path))
+    return _load_model_cached(model_path, mtimes, backend)
+
+
+@profiled('box_stats', cache=True)
+@st.cache_resource(max_entries=16)
+def get_box_stats(_catalog, dataset_version, year, by='station', col='PM2.5'):
+    """Statistik box plot per tahun dihitung sekali di server (bukan seluruh baris dikirim ke browser).
+    Hanya partisi tahun tersebut dan kolom `by`/`col` yang dibaca."""
+    cache_miss()
+    return box_stats(read_partitions(_catalog, years=[year], columns=[by, col]), by, col)
+
+
+def box_figure(stats, by, title):
+    """Box plot Plotly dari statistik yang sudah dihitung (satu kotak + titik outlier per kelompok)."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, row in enumerate(stats.itertuples(index=False)):
+        name, color = getattr(row, by), colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=[name], q1=[row.q1], median=[row.median], q3=[row.q3], mean=[row.mean],
+            lowerfence=[row.lowerfence], upperfence=[row.upperfence],
+            name=name, marker_color=color, boxpoints=False, legendgroup=name,
+        ))
+        fig.add_trace(go.Scatter(
+            x=[name] * len(row.outliers), y=row.outliers, mode='markers', name=name,
+            marker=dict(color=color, size=4), legendgroup=name, showlegend=False,
+        ))
+    fig.update_layout(title=title, xaxis_title=by, yaxis_title='PM2.5')
+    return fig
+
+
+# --- Heatmap: dirender sekali per input menjadi PNG (LRU st.cache_data) atau Plotly di sisi klien ---
+# 'matplotlib' (gambar PNG dari cache) atau 'plotly' (interaktif, dirender di browser)
+HEATMAP_RENDERER = os.environ.get('PDSD_HEATMAP_RENDERER', 'matplotlib')
+FIGURE_CACHE_SIZE = int(os.environ.get('PDSD_FIGURE_CACHE_SIZE', '32'))
+HEATMAP_TITLE = "Intensitas Polutan per Stasiun (nilai aktual ditampilkan, warna = relatif)"
+
+
+@profiled('station_heatmap_png', cache=True)
+@st.cache_data(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def station_heatmap_png(_heatmap_data, dataset_version):
+    cache_miss()
+    heatmap_norm = (_heatmap_data - _heatmap_data.min()) / (_heatmap_data.max() - _heatmap_data.min())
+    return heatmap_png(heatmap_norm, _heatmap_data.values, '.0f', 'YlOrRd', title=HEATMAP_TITLE,
+                       xlabel="Polutan", ylabel="Stasiun", cbar_label='Intensitas Relatif (Dinormalisasi)',
+                       linewidths=0.5)
+
+
+@profiled('corr_stats', cache=True)
+@st.cache_resource(max_entries=2)
+def get_corr_stats(_catalog, dataset_version):
+    """Statistik cukup korelasi per stasiun/tahun/bulan; matriks untuk cakupan apa pun = penjumlahan array."""
+    cache_miss()
+    return load_corr_stats(lambda: read_partitions(_catalog, columns=CORR_KEYS + NUMERIC_COLS), dataset_version)
+
+
+@profiled('correlation_heatmap_png', cache=True)
+@st.cache_data(max_entries=FIGURE_CACHE_SIZE, show_spinner=False)
+def correlation_heatmap_png(_corr_matrix, dataset_version, scope):
+    """`scope` (stasiun, tahun, musim) adalah kunci cache gambar untuk matriks yang sama."""
+    cache_miss()
+    return heatmap_png(_corr_matrix, True, '.2f', 'coolwarm', figsize=(10, 8))
+
+
+@profiled('lagged_correlation', cache=True)
+@st.cache_data(max_entries=FIGURE_CACHE_SIZE, show_spinner="Menghitung korelasi silang...")
+def get_lagged_correlation(_catalog, dataset_version, x, y, max_lag, station=None, year=None, season=None):
+    """Korelasi silang x vs y tertunda 0..max_lag jam; hanya partisi & kolom cakupan yang dibaca."""
+    cache_miss()
+    months = SEASONS[season] if season else None
+    df = read_partitions(_catalog, years=None if year is None else [year],
+                         stations=None if station is None else [station],
+                         columns=list(dict.fromkeys(['station', 'datetime', x, y])),
+                         filters=None if months is None else [('month', 'in', list(months))])
+    return lagged_correlation(df, x, y, max_lag)
+
+
+def station_heatmap_plotly(heatmap_data):
+    import plotly.graph_objects as go
+
+    heatmap_norm = (heatmap_data - heatmap_data.min()) / (heatmap_data.max() - heatmap_data.min())
+    fig = go.Figure(go.Heatmap(
+        z=heatmap_norm.values, x=list(heatmap_data.columns), y=list(heatmap_data.index),
+        text=heatmap_data.values, texttemplate="%{text:.0f}", colorscale='YlOrRd',
+        colorbar=dict(title='Intensitas Relatif (Dinormalisasi)'),
+    ))
+    fig.update_layout(title=HEATMAP_TITLE, xaxis_title="Polutan", yaxis_title="Stasiun",
+                      yaxis_autorange='reversed', height=450)
+    return fig
+
+
+def correlation_heatmap_plotly(corr_matrix):
+    import plotly.express as px
+
+    fig = px.imshow(corr_matrix, text_auto='.2f', color_continuous_scale='RdBu_r', zmin=-1, zmax=1)
+    fig.update_layout(height=600)
+    return fig
+
+
+# --- Peta: satu layer marker (GeoJSON / FastMarkerCluster), HTML di-cache per input ---
+# Di atas jumlah stasiun ini marker dikelompokkan dengan FastMarkerCluster
+MAP_CLUSTER_THRESHOLD = 100
+
+# Gaya marker diambil dari properti GeoJSON di browser, tanpa style_function Python per fitur
+_MARKER_STYLE_JS = """
+function (feature, layer) {
+    var p = feature.properties;
+    layer.setStyle({color: p.color, fillColor: p.fill_color || p.color, fillOpacity: p.fill_opacity || 0.7});
+    layer.setRadius(p.radius);
+    layer.bindPopup(p.popup);
+    if (p.tooltip) { layer.bindTooltip(p.tooltip); }
+}
+"""
+_CLUSTER_MARKER_JS = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {color: row[2], fillColor: row[2], fillOpacity: 0.7, radius: row[3]});
+    marker.bindPopup(row[4]);
+    return marker;
+}
+"""
+
+
+def station_layer(features, cluster=None):
+    """Layer folium tunggal untuk semua marker (hasil station_map_features atau yang sejenis)."""
+    import folium
+    from folium.plugins import FastMarkerCluster
+    from folium.utilities import JsCode
+
+    if cluster is None:
+        cluster = len(features) > MAP_CLUSTER_THRESHOLD
+    if cluster:
+        rows = features[['lat', 'lon', 'color', 'radius', 'popup']].values.tolist()
+        return FastMarkerCluster(rows, callback=_CLUSTER_MARKER_JS)
+    return folium.GeoJson(features_to_geojson(features), marker=folium.CircleMarker(fill=True),
+                          on_each_feature=JsCode(_MARKER_STYLE_JS))
+
+
+@profiled('show_map')
+def show_map(html, width, height):
+    """Menampilkan HTML peta yang sudah dirender (st.iframe pada Streamlit baru, components.html jika belum ada)."""
+    if hasattr(st, 'iframe'):
+        st.iframe(html, width=width, height=height)
+    else:
+        import streamlit.components.v1 as components
+        components.html(html, width=width, height=height)
+
+
+@profiled('folium_geo_map', cache=True)
+@st.cache_data(max_entries=64, show_spinner=False)
+def geo_map_html(_cube, dataset_version, year, pollutant):
+    """HTML peta rata-rata polutan per stasiun; dibangun sekali per (versi dataset, tahun, polutan)."""
+    cache_miss()
+    import folium
+
+    station_stats = rollup(_cube, 'station', ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3'], year=year).reset_index()
+    m = folium.Map(location=[40.0, 116.4], zoom_start=9)
+    station_layer(station_map_features(station_stats, pollutant)).add_to(m)
+    return m.get_root().render()
+
+
+@profiled('folium_station_map', cache=True)
+@st.cache_data(max_entries=32, show_spinner=False)
+def station_location_map_html(station_name):
+    """HTML peta lokasi: semua stasiun abu-abu, stasiun terpilih kuning dengan label."""
+    cache_miss()
+    import folium
+
+    names = list(STATION_COORDS)
+    selected = np.array([name == station_name for name in names])
+    coords = np.array([STATION_COORDS[name] for name in names])
+    features = pd.DataFrame({
+        'station': names, 'lat': coords[:, 0], 'lon': coords[:, 1],
+        'color': np.where(selected, '#B8860B', '#888888'),
+        'fill_color': np.where(selected, '#FFD700', '#888888'),
+        'fill_opacity': np.where(selected, 0.95, 0.5),
+        'radius': np.where(selected, 16, 6),
+        'popup': [f"<b>📍 {name}</b><br>Lat: {lat}<br>Lon: {lon}" if sel else name
+                  for name, (lat, lon), sel in zip(names, coords.tolist(), selected)],
+        'tooltip': np.where(selected, [f"⭐ {name} (dipilih)" for name in names], ''),
+    })
+    # Stasiun terpilih digambar terakhir agar berada di atas
+    features = features.iloc[np.argsort(selected, kind='stable')]
+
+    station_coords = STATION_COORDS.get(station_name, [40.0, 116.4])
+    pred_map = folium.Map(location=station_coords, zoom_start=11)
+    station_layer(features, cluster=False).add_to(pred_map)
+    folium.Marker(
+        location=station_coords,
+        icon=folium.DivIcon(
+            html=f'<div style="font-size:11px; font-weight:bold; color:#1a1a1a; '
+                 f'background:rgba(255,215,0,0.85); padding:3px 7px; border-radius:5px; '
+                 f'border:1.5px solid #B8860B; white-space:nowrap; margin-top:18px;">'
+                 f'📍 {station_name}</div>',
+            icon_size=(160, 30),
+            icon_anchor=(80, 0)
+        )
+    ).add_to(pred_map)
+    return pred_map.get_root().render()
+
+
+@profiled('model_version', cache=True)
+@st.cache_data(max_entries=4)
+def _model_version_cached(model_path, mtime_ns):
+    cache_miss()
+    return model_version(model_path)
+
+
+def get_model_version(backend=INFERENCE_BACKEND):
+    """Sidik jari isi file yang dijalankan backend (.npz untuk 'numpy'); hash hanya dihitung ulang jika mtime berubah."""
+    path = serving_model_path(backend)
+    return _model_version_cached(path, os.stat(path).st_mtime_ns)
+
+
+@st.cache_resource
+def get_prediction_cache():
+    """Satu cache prediksi per proses, dipakai bersama oleh semua sesi pengguna."""
+    return PredictionCache()
+
+
+@profiled('station_scalers', cache=True)
+@st.cache_resource(max_entries=2)
+def get_station_scalers(_catalog, dataset_version, scaler_path=SCALER_PATH):
+    """`dataset_version` memastikan stasiun baru ikut terdeteksi setelah append."""
+    cache_miss()
+    return load_station_scalers(lambda: read_partitions(_catalog, columns=['station', *FEATURE_COLS]),
+                                scaler_path, stations=_catalog['stations'])
+
+
+@profiled('station_arrays', cache=True)
+@st.cache_resource(max_entries=2)
+def get_station_arrays(_catalog, dataset_version):
+    """Seluruh riwayat dibutuhkan untuk prediksi; dengan salinan bersama berupa view tanpa salinan."""
+    cache_miss()
+    return load_station_arrays(_catalog)
 
-    df_list = []
-    for filename in csv_files:
-        temp_df = pd.read_csv(filename)
-        df_list.append(temp_df)
 
-    df = pd.concat(df_list, ignore_index=True)
+# --- Profil rerun: aksi = widget (ber-key) yang nilainya berubah sejak rerun sebelumnya ---
+PROFILE_PANEL = os.environ.get('PDSD_PROFILE_PANEL', '0') == '1'
+BUTTON_KEYS = {'run_batch', 'run_prediction'}
 
-    # Data Cleaning & Datetime
-    df['datetime'] = pd.to_datetime(df[['year', 'month', 'day', 'hour']])
 
-    # Handling Missing Values
-    cols_to_fill = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3', 'TEMP', 'PRES', 'DEWP', 'RAIN', 'WSPM']
-    df[cols_to_fill] = df[cols_to_fill].fillna(method='ffill')
+def widget_snapshot():
+    """Nilai widget ber-key; tanggal, waktu, dan pilihan ganda (tuple/list) dibandingkan lewat repr."""
+    snapshot = {}
+    for key, value in st.session_state.items():
+        if key.startswith('_'):
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            snapshot[key] = value
+        elif isinstance(value, (datetime.date, datetime.datetime, datetime.time, tuple, list)):
+            snapshot[key] = repr(value)
+    return snapshot
+
+
+def rerun_action(snapshot):
+    previous = st.session_state.get('_profile_widgets')
+    if previous is None:
+        return 'load'
+    # Tombol hanya bernilai True pada rerun saat diklik; kembalinya ke False bukan aksi pengguna
+    changed = sorted(key for key in snapshot if previous.get(key) != snapshot[key]
+                     and not (key in BUTTON_KEYS and not snapshot[key]))
+    return ', '.join(changed) or 'rerun'
+
+
+def profile_table(records):
+    """Tabel tahap untuk panel debug; nama tahap diindentasi menurut tingkat bersarangnya."""
+    return pd.DataFrame({
+        'Tahap': ['\u2003' * r.get('depth', 0) + r['stage'] for r in records],
+        'ms': [round(r.get('seconds', 0.0) * 1e3, 2) for r in records],
+        'Cache': [r['cache'] or '' for r in records],
+        'Baris': [r['rows'] for r in records],
+        'ΔRSS (MB)': [round(r.get('rss_delta_mb', 0.0), 1) for r in records],
+    })
+
+
+profile = start_profile(page="Memuat dataset", action=rerun_action(widget_snapshot()))
+
+
+def stop_rerun():
+    """st.stop() setelah profil ditutup, sehingga rerun yang gagal memuat data tetap tercatat & diekspor."""
+    finish_profile(profile, time.perf_counter() - SCRIPT_START)
+    st.stop()
 
-    return df
 
 try:
     with st.spinner('Memuat dataset...'):
-        df = load_data()
-        if df.empty:
-            st.stop()
+        catalog = load_catalog()
+        if catalog is None:
+            stop_rerun()
 except Exception as e:
     st.error(f"Terjadi kesalahan saat memuat data: {e}")
-    st.stop()
+    stop_rerun()
 
 # ==========================================
 # 3. SIDEBAR NAVIGATION
@@ -112,19 +431,31 @@ menu = st.sidebar.radio("Navigasi", [
     "Exploratory Data Analysis 📊",
     "PM2.5 Prediction (LSTM) 🤖",
     "Kesimpulan 📝"
-])
+], key='menu')
 
 # Filter Tahun di Sidebar (Global)
-year_list = sorted(df['year'].unique())
-selected_year = st.sidebar.selectbox("Pilih Tahun (untuk visualisasi)", year_list)
+year_list = catalog['years']
+selected_year = st.sidebar.selectbox("Pilih Tahun (untuk visualisasi)", year_list, key='selected_year')
+profile.page = menu
+
+# Heatmap sebagai gambar PNG (di-cache di server) atau Plotly interaktif (dirender di browser)
+heatmap_renderer = 'plotly' if st.sidebar.toggle("Heatmap interaktif (Plotly)",
+                                                 value=HEATMAP_RENDERER == 'plotly') else 'matplotlib'
 
-# Filter Data berdasarkan tahun
-df_filtered = df[df['year'] == selected_year]
+# Versi dataset dipakai sebagai kunci cache untuk semua agregat turunan; data per tahun tidak
+# disalin di sini, tiap tampilan membaca partisi tahun terpilih lewat cache-nya sendiri
+version = catalog['version']
+
+# Agregat pra-hitung untuk semua grafik/tabel berbasis rata-rata
+cube = get_rollup_cube(catalog, version)
 
 # ==========================================
 # 4. HALAMAN: INFORMASI POLUSI UDARA (BARU)
 # ==========================================
 if menu == "Informasi Polusi Udara 📚":
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.subheader("📚 Apa Itu Polusi Udara?")
 
     st.markdown("""
@@ -308,7 +639,7 @@ if menu == "Informasi Polusi Udara 📚":
         st.write("### 🌍 Paparan PM2.5 di Beijing vs Standar WHO")
 
         # Visualisasi perbandingan rata-rata tahunan per stasiun vs standar WHO
-        station_annual = df.groupby('station')['PM2.5'].mean().reset_index()
+        station_annual = rollup(cube, 'station', ['PM2.5']).reset_index()
         station_annual.columns = ['Stasiun', 'Rata-rata PM2.5']
         station_annual = station_annual.sort_values('Rata-rata PM2.5', ascending=True)
 
@@ -360,21 +691,7 @@ if menu == "Informasi Polusi Udara 📚":
         st.write("")
         st.write("### 🗺️ Berapa Parah Polusi Beijing? — Analisis dari Dataset Nyata")
 
-        def classify_aqi(pm25):
-            if pd.isna(pm25): return "Tidak Diketahui"
-            if pm25 <= 12: return "🟢 Baik"
-            elif pm25 <= 35.4: return "🟡 Sedang"
-            elif pm25 <= 55.4: return "🟠 Tidak Sehat (Sensitif)"
-            elif pm25 <= 150.4: return "🔴 Tidak Sehat"
-            elif pm25 <= 250.4: return "🟣 Sangat Tidak Sehat"
-            else: return "🟤 Berbahaya"
-
-        df_aqi = df.dropna(subset=['PM2.5']).copy()
-        df_aqi['Kategori AQI'] = df_aqi['PM2.5'].apply(classify_aqi)
-        aqi_counts = df_aqi['Kategori AQI'].value_counts().reset_index()
-        aqi_counts.columns = ['Kategori', 'Jumlah Jam']
-        aqi_counts['Persentase (%)'] = (aqi_counts['Jumlah Jam'] / aqi_counts['Jumlah Jam'].sum() * 100).round(1)
-        aqi_counts = aqi_counts[aqi_counts['Kategori'] != 'Tidak Diketahui']
+        aqi_counts, aqi_yearly_pct = get_aqi_distribution(catalog, version)
 
         color_map = {
             "🟢 Baik": "#4CAF50",
@@ -413,12 +730,6 @@ if menu == "Informasi Polusi Udara 📚":
 
         # Tren AQI per tahun
         st.write("#### 📅 Tren Kategori AQI per Tahun")
-        df_aqi['year'] = df_aqi['year'].astype(int)
-        aqi_yearly = df_aqi.groupby(['year', 'Kategori AQI']).size().reset_index(name='Jumlah Jam')
-        aqi_yearly_pct = aqi_yearly.copy()
-        total_per_year = aqi_yearly.groupby('year')['Jumlah Jam'].transform('sum')
-        aqi_yearly_pct['Persentase (%)'] = (aqi_yearly['Jumlah Jam'] / total_per_year * 100).round(1)
-
         fig_yearly = px.bar(
             aqi_yearly_pct, x='year', y='Persentase (%)',
             color='Kategori AQI', color_discrete_map=color_map,
@@ -446,21 +757,24 @@ if menu == "Informasi Polusi Udara 📚":
         with d3:
             st.metric("⏱️ Resolusi", "Per Jam (Hourly)")
         with d4:
-            st.metric("📊 Total Baris Data", f"{len(df):,}")
+            st.metric("📊 Total Baris Data", f"{catalog['rows']:,}")
 
         st.write("#### 📋 Statistik Deskriptif Polutan (Semua Stasiun, 2013–2017)")
 
         summary_cols = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3']
+        # Semua statistik berasal dari sketsa yang sudah di-cache (tanpa memindai ulang kolom)
+        sketches = get_summary_sketches(catalog, version)
         summary_data = []
         for col in summary_cols:
+            sk = sketches[col]
             summary_data.append({
                 "Polutan": col,
-                "Rata-rata": f"{df[col].mean():.2f}",
-                "Minimum": f"{df[col].min():.2f}",
-                "Median (Q2)": f"{df[col].median():.2f}",
-                "Q3 (75%)": f"{df[col].quantile(0.75):.2f}",
-                "Maksimum": f"{df[col].max():.2f}",
-                "Data Tersedia (%)": f"{df[col].notna().sum() / len(df) * 100:.1f}%",
+                "Rata-rata": f"{sk['mean']:.2f}",
+                "Minimum": f"{sk['min']:.2f}",
+                "Median (Q2)": f"{sketch_quantile(sk, 0.5):.2f}",
+                "Q3 (75%)": f"{sketch_quantile(sk, 0.75):.2f}",
+                "Maksimum": f"{sk['max']:.2f}",
+                "Data Tersedia (%)": f"{sk['n'] / (sk['n'] + sk['missing']) * 100:.1f}%",
                 "Satuan": "µg/m³"
             })
 
@@ -469,7 +783,7 @@ if menu == "Informasi Polusi Udara 📚":
 
         st.write("#### 🏭 Profil Rata-rata Polutan per Stasiun")
 
-        station_profile = df.groupby('station')[summary_cols].mean().round(2).reset_index()
+        station_profile = rollup(cube, 'station', summary_cols).round(2).reset_index()
         station_profile = station_profile.rename(columns={'station': 'Stasiun'})
         station_profile = station_profile.sort_values('PM2.5', ascending=False)
         st.dataframe(station_profile, use_container_width=True, hide_index=True)
@@ -478,18 +792,11 @@ if menu == "Informasi Polusi Udara 📚":
         st.write("#### 🌡️ Heatmap Intensitas Polutan per Stasiun")
         heatmap_data = station_profile.set_index('Stasiun')[summary_cols]
 
-        # Normalisasi untuk heatmap agar skala sebanding
-        heatmap_norm = (heatmap_data - heatmap_data.min()) / (heatmap_data.max() - heatmap_data.min())
-
-        fig_heat, ax = plt.subplots(figsize=(10, 5))
-        sns.heatmap(heatmap_norm, annot=heatmap_data.values, fmt='.0f',
-                    cmap='YlOrRd', ax=ax, linewidths=0.5,
-                    cbar_kws={'label': 'Intensitas Relatif (Dinormalisasi)'})
-        ax.set_title("Intensitas Polutan per Stasiun (nilai aktual ditampilkan, warna = relatif)")
-        ax.set_xlabel("Polutan")
-        ax.set_ylabel("Stasiun")
-        plt.tight_layout()
-        st.pyplot(fig_heat)
+        # Warna dinormalisasi per polutan agar skala sebanding; angka = nilai aktual
+        if heatmap_renderer == 'plotly':
+            st.plotly_chart(station_heatmap_plotly(heatmap_data), use_container_width=True)
+        else:
+            st.image(station_heatmap_png(heatmap_data, version), use_container_width=True)
 
         st.markdown("""
         <div class="insight-box">
@@ -509,42 +816,13 @@ elif menu == "Geo-Analysis 🗺️":
 
     st.markdown("""
     Halaman ini menampilkan lokasi stasiun pemantauan kualitas udara di Beijing. 
-    Warna dan ukuran lingkaran merepresentasikan tingkat rata-rata PM2.5 di stasiun tersebut.
+    Warna dan ukuran lingkaran merepresentasikan tingkat rata-rata polutan terpilih di stasiun tersebut.
     """)
 
-    # Hitung rata-rata per stasiun untuk tahun terpilih
-    station_stats = df_filtered.groupby('station')[['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3']].mean().reset_index()
+    pollutant = st.selectbox("Polutan", ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3'])
 
-    # Tambahkan koordinat
-    station_stats['lat'] = station_stats['station'].map(lambda x: STATION_COORDS.get(x, [0,0])[0])
-    station_stats['lon'] = station_stats['station'].map(lambda x: STATION_COORDS.get(x, [0,0])[1])
-
-    # Peta Folium
-    m = folium.Map(location=[40.0, 116.4], zoom_start=9)
-
-    # Tambahkan Marker
-    for _, row in station_stats.iterrows():
-        pm25 = row['PM2.5']
-        color = 'green' if pm25 <= 50 else 'yellow' if pm25 <= 100 else 'orange' if pm25 <= 150 else 'red'
-
-        popup_text = f"""
-        <b>{row['station']}</b><br>
-        PM2.5: {pm25:.2f}<br>
-        PM10: {row['PM10']:.2f}<br>
-        SO2: {row['SO2']:.2f}
-        """
-
-        folium.CircleMarker(
-            location=[row['lat'], row['lon']],
-            radius=10 + (pm25/10),
-            popup=popup_text,
-            color=color,
-            fill=True,
-            fill_color=color,
-            fill_opacity=0.7
-        ).add_to(m)
-
-    st_folium(m, width=1000, height=500)
+    # Rata-rata per stasiun untuk tahun terpilih -> satu layer marker; HTML peta di-cache per input
+    show_map(geo_map_html(cube, version, selected_year, pollutant), width=1000, height=500)
 
     st.markdown("""
     <div class="insight-box">
@@ -557,13 +835,15 @@ elif menu == "Geo-Analysis 🗺️":
 # 6. HALAMAN: EDA
 # ==========================================
 elif menu == "Exploratory Data Analysis 📊":
+    import plotly.express as px
+
     st.subheader("📊 Analisis Eksplorasi Data (EDA)")
 
     tab1, tab2, tab3 = st.tabs(["Tren Waktu", "Korelasi", "Perbandingan Stasiun"])
 
     with tab1:
         st.write("### Tren Polutan Bulanan")
-        monthly_trend = df_filtered.groupby('month')[['PM2.5', 'PM10', 'SO2', 'NO2', 'O3']].mean()
+        monthly_trend = rollup(cube, 'month', ['PM2.5', 'PM10', 'SO2', 'NO2', 'O3'], year=selected_year)
 
         fig_trend = px.line(monthly_trend, x=monthly_trend.index, y=['PM2.5', 'PM10', 'SO2', 'NO2', 'O3'],
                             title=f"Rata-rata Polutan Bulanan Tahun {selected_year}",
@@ -575,11 +855,28 @@ elif menu == "Exploratory Data Analysis 📊":
     with tab2:
         st.write("### Heatmap Korelasi Antar Variabel")
         cols_corr = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3', 'TEMP', 'PRES', 'DEWP', 'RAIN', 'WSPM']
-        corr_matrix = df_filtered[cols_corr].corr()
 
-        fig_corr = plt.figure(figsize=(10, 8))
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', fmt=".2f")
-        st.pyplot(fig_corr)
+        # Cakupan bebas (stasiun x tahun x musim): matriks dijumlahkan dari statistik cukup, tanpa memindai baris
+        all_stations, all_years = "Semua stasiun", "Semua tahun"
+        sc1, sc2, sc3 = st.columns(3)
+        with sc1:
+            corr_station = st.selectbox("Stasiun", [all_stations] + catalog['stations'], key='corr_station')
+        with sc2:
+            corr_year = st.selectbox("Tahun", [all_years] + year_list, index=year_list.index(selected_year) + 1,
+                                     key='corr_year')
+        with sc3:
+            corr_season = st.selectbox("Musim", list(SEASONS), key='corr_season')
+        scope = (None if corr_station == all_stations else corr_station,
+                 None if corr_year == all_years else corr_year,
+                 None if SEASONS[corr_season] is None else corr_season)
+
+        corr_matrix = correlate(get_corr_stats(catalog, version), cols_corr,
+                                station=scope[0], year=scope[1], month=SEASONS[corr_season])
+
+        if heatmap_renderer == 'plotly':
+            st.plotly_chart(correlation_heatmap_plotly(corr_matrix), use_container_width=True)
+        else:
+            st.image(correlation_heatmap_png(corr_matrix, version, scope), use_container_width=True)
 
         st.markdown("""
         **Analisis Korelasi:**
@@ -588,16 +885,43 @@ elif menu == "Exploratory Data Analysis 📊":
         - **PM2.5 & WSPM:** Korelasi negatif (angin kencang membantu menyebarkan polutan).
         """)
 
+        st.write("### Korelasi Silang Tertunda (Lag)")
+        st.caption("Korelasi antara variabel X pada jam t dan variabel Y pada jam t − lag, "
+                   "untuk cakupan stasiun/tahun/musim yang sama dengan heatmap di atas.")
+        lc1, lc2, lc3 = st.columns(3)
+        with lc1:
+            lag_x = st.selectbox("Variabel X", cols_corr, index=cols_corr.index('PM2.5'), key='lag_x')
+        with lc2:
+            lag_y = st.selectbox("Variabel Y (mendahului)", cols_corr, index=cols_corr.index('WSPM'), key='lag_y')
+        with lc3:
+            max_lag = st.slider("Lag maksimum (jam)", 6, 168, 48, step=6, key='max_lag')
+
+        lagged = get_lagged_correlation(catalog, version, lag_x, lag_y, max_lag, *scope)
+        fig_lag = px.line(lagged.reset_index(), x='lag', y='r', markers=True,
+                          title=f"Korelasi {lag_x}(t) vs {lag_y}(t − lag)",
+                          labels={'lag': 'Lag (jam)', 'r': 'Korelasi Pearson'})
+        fig_lag.add_hline(y=0, line_dash='dot', line_color='gray')
+        st.plotly_chart(fig_lag, use_container_width=True)
+        if lagged.notna().any():
+            best_lag = int(lagged.abs().idxmax())
+            st.caption(f"Korelasi terkuat pada lag **{best_lag} jam** (r = {lagged[best_lag]:.3f}).")
+
     with tab3:
         st.write("### Distribusi PM2.5 per Stasiun")
-        fig_box = px.box(df_filtered, x='station', y='PM2.5', color='station',
-                         title=f"Distribusi PM2.5 per Stasiun ({selected_year})")
+        # Kuartil, whisker & outlier (maks. BOX_MAX_OUTLIERS per stasiun) dihitung di server
+        station_box = get_box_stats(catalog, version, selected_year)
+        fig_box = box_figure(station_box, 'station', f"Distribusi PM2.5 per Stasiun ({selected_year})")
         st.plotly_chart(fig_box, use_container_width=True)
+        st.caption(f"Outlier ditampilkan paling banyak {BOX_MAX_OUTLIERS} titik per stasiun "
+                   f"(termasuk nilai paling ekstrem).")
 
 # ==========================================
 # 7. HALAMAN: PREDIKSI (LSTM)
 # ==========================================
 elif menu == "PM2.5 Prediction (LSTM) 🤖":
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.subheader("🤖 Prediksi PM2.5 Menggunakan LSTM")
 
     st.markdown("""
@@ -609,176 +933,266 @@ elif menu == "PM2.5 Prediction (LSTM) 🤖":
     if 'pred_result' not in st.session_state:
         st.session_state.pred_result = None
 
-    model_path = "./model/pm25_lstm_model.keras"
-
-    if not os.path.exists(model_path):
-        st.warning(f"File model '{model_path}' tidak ditemukan. Silakan upload file model .keras Anda.")
+    # Hanya backend yang file modelnya tersedia (replika ringan: .npz saja, tanpa .keras)
+    backends = [b for b in INFERENCE_BACKENDS if model_artifacts(b)]
+    if not backends:
+        st.warning(f"File model '{MODEL_PATH}' tidak ditemukan. Silakan upload file model .keras Anda.")
     else:
         try:
-            model = load_model(model_path)
-
-            st.write("#### Simulasi Prediksi")
-            st.write("Pilih stasiun dan waktu untuk mengambil 24 jam data sebelumnya sebagai input model.")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                pred_station = st.selectbox("Pilih Stasiun", df['station'].unique())
-            with col2:
-                min_date = df['datetime'].min() + pd.Timedelta(days=2)
-                max_date = df['datetime'].max()
-                pred_date = st.date_input("Pilih Tanggal", value=max_date, min_value=min_date, max_value=max_date)
-
-            pred_hour = st.slider("Pilih Jam", 0, 23, 12)
-
-            # Jika parameter input berubah, hapus hasil lama agar tidak membingungkan
-            current_key = f"{pred_station}_{pred_date}_{pred_hour}"
-            if st.session_state.pred_result is not None:
-                if st.session_state.pred_result.get('key') != current_key:
-                    st.session_state.pred_result = None
-
-            target_time = pd.to_datetime(f"{pred_date} {pred_hour}:00:00")
-            df_station = df[df['station'] == pred_station].sort_values('datetime')
-            mask = df_station['datetime'] == target_time
-
-            if mask.sum() > 0:
-                idx = df_station.index[df_station['datetime'] == target_time][0]
-                feature_cols = ['PM2.5', 'PM10', 'SO2', 'NO2', 'CO', 'O3']
-                pos = df_station.index.get_loc(idx)
-
-                if pos >= 24:
-                    input_data = df_station.iloc[pos-24:pos][feature_cols]
-                    actual_val = df_station.iloc[pos]['PM2.5']
-
-                    st.write("Data Input (24 Jam Terakhir):")
-                    st.dataframe(input_data.tail())
-
-                    if st.button("🔍 Jalankan Prediksi"):
-                        with st.spinner("Menjalankan model LSTM..."):
-                            scaler = MinMaxScaler()
-                            scaler.fit(df_station[feature_cols])
-
-                            input_scaled = scaler.transform(input_data)
-                            input_reshaped = input_scaled.reshape(1, 24, len(feature_cols))
-
-                            prediction_scaled = model.predict(input_reshaped)
-
-                            dummy = np.zeros((1, len(feature_cols)))
-                            dummy[0, 0] = prediction_scaled[0, 0]
-                            prediction_final = float(scaler.inverse_transform(dummy)[0, 0])
-
-                        # Simpan semua hasil ke session_state — tidak akan hilang saat re-render
-                        st.session_state.pred_result = {
-                            'key': current_key,
-                            'prediction_final': prediction_final,
-                            'actual_val': float(actual_val),
-                            'history_pm25': input_data['PM2.5'].tolist(),
-                            'station': pred_station,
-                        }
-
-                    # Render hasil dari session_state (persisten lintas re-render)
-                    if st.session_state.pred_result is not None:
-                        res = st.session_state.pred_result
-                        prediction_final = res['prediction_final']
-                        actual_val = res['actual_val']
-                        history_pm25 = res['history_pm25']
-                        station_name = res['station']
-
-                        st.markdown("---")
-                        st.write("#### 📊 Hasil Prediksi")
-
-                        m1, m2, m3 = st.columns(3)
-                        m1.metric(
-                            label="🤖 Prediksi PM2.5 (1 Jam ke depan)",
-                            value=f"{prediction_final:.2f} µg/m³"
-                        )
-                        m2.metric(
-                            label="✅ Nilai Aktual",
-                            value=f"{actual_val:.2f} µg/m³",
-                            delta=f"{prediction_final - actual_val:.2f}"
-                        )
-                        m3.metric(
-                            label="📏 Error Absolut",
-                            value=f"{abs(prediction_final - actual_val):.2f} µg/m³"
+            backend = st.selectbox(
+                "Backend Inferensi", backends,
+                index=backends.index(INFERENCE_BACKEND) if INFERENCE_BACKEND in backends else 0,
+                format_func=lambda b: {'numpy': "NumPy (ringan, tanpa TensorFlow)", 'keras': "Keras / TensorFlow"}[b],
+                key='backend',
+            )
+            model = get_model(MODEL_PATH, backend)
+            station_arrays = get_station_arrays(catalog, version)
+
+            pred_mode = st.radio("Mode Prediksi", ["Satu Stasiun & Jam", "Batch (Multi-Stasiun / Rentang Tanggal)"],
+                                 horizontal=True, key='pred_mode')
+
+            if pred_mode == "Batch (Multi-Stasiun / Rentang Tanggal)":
+                st.write("#### Prediksi Batch")
+                st.write("Prediksi satu jam ke depan untuk setiap jam pada rentang tanggal dan stasiun yang dipilih.")
+
+                batch_stations = st.multiselect("Pilih Stasiun", list(STATION_COORDS), default=list(STATION_COORDS),
+                                                key='batch_stations')
+                min_date, max_date = station_time_bounds(station_arrays)
+                min_date, max_date = (min_date + pd.Timedelta(days=2)).date(), max_date.date()
+                batch_range = st.date_input("Rentang Tanggal", value=(max_date - pd.Timedelta(days=6), max_date),
+                                            min_value=min_date, max_value=max_date, key='batch_range')
+
+                # Hasil batch lama dibuang jika stasiun, rentang, atau backend berubah
+                batch_key = (tuple(batch_stations), tuple(batch_range), backend)
+                if st.session_state.get('batch_result') is not None:
+                    if st.session_state.batch_result.get('key') != batch_key:
+                        st.session_state.batch_result = None
+
+                # Tombol dinonaktifkan sampai input lengkap (date_input berisi satu tanggal selama rentang dipilih)
+                batch_ready = bool(batch_stations) and len(batch_range) == 2
+                if not batch_stations:
+                    st.info("Pilih minimal satu stasiun.")
+                elif len(batch_range) != 2:
+                    st.info("Pilih tanggal awal dan tanggal akhir rentang prediksi.")
+
+                if st.button("🚀 Jalankan Prediksi Batch", key='run_batch', disabled=not batch_ready):
+                    with st.spinner("Menjalankan model LSTM secara batch..."):
+                        t_start = time.perf_counter()
+                        batch_df = predict_batch(
+                            model, station_arrays, get_station_scalers(catalog, version),
+                            stations=batch_stations,
+                            start=pd.Timestamp(batch_range[0]),
+                            end=pd.Timestamp(batch_range[1]) + pd.Timedelta(hours=23),
                         )
+                        elapsed = time.perf_counter() - t_start
+                    st.session_state.batch_result = {'key': batch_key, 'df': batch_df, 'elapsed': elapsed}
+
+                if st.session_state.get('batch_result') is not None:
+                    batch_df = st.session_state.batch_result['df']
+                    elapsed = st.session_state.batch_result['elapsed']
+                    valid = batch_df.dropna(subset=['actual', 'predicted'])
+
+                    b1, b2, b3, b4 = st.columns(4)
+                    b1.metric("🪟 Jumlah Jendela", f"{len(batch_df):,}")
+                    b2.metric("⚡ Throughput", f"{len(batch_df) / max(elapsed, 1e-9):,.0f} jendela/detik")
+                    b3.metric("📏 MAE", f"{valid['error'].abs().mean():.2f} µg/m³")
+                    b4.metric("📐 RMSE", f"{np.sqrt((valid['error'] ** 2).mean()):.2f} µg/m³")
+
+                    per_station = valid.groupby('station')['error'].agg(
+                        MAE=lambda e: e.abs().mean(), RMSE=lambda e: np.sqrt((e ** 2).mean())
+                    ).round(2).reset_index().rename(columns={'station': 'Stasiun'})
+                    st.dataframe(per_station, use_container_width=True, hide_index=True)
+
+                    # Maks. PLOT_MAX_POINTS titik per garis (LTTB) agar ukuran grafik tidak tumbuh dengan rentang
+                    plot_df = downsample(batch_df, 'datetime', ['actual', 'predicted'], by='station')
+                    fig_batch = px.line(plot_df, x='datetime', y='value', color='variable', facet_row='station',
+                                        height=max(300, 180 * batch_df['station'].nunique()),
+                                        title="PM2.5 Aktual vs Prediksi per Stasiun")
+                    st.plotly_chart(fig_batch, use_container_width=True)
+
+                    st.download_button("⬇️ Unduh Hasil (CSV)", batch_df.to_csv(index=False).encode('utf-8'),
+                                       file_name="prediksi_batch_pm25.csv", mime="text/csv")
 
-                        # Plot prediksi
-                        fig_pred = go.Figure()
-                        fig_pred.add_trace(go.Scatter(
-                            y=history_pm25, x=list(range(-24, 0)),
-                            mode='lines+markers', name='History (24h)',
-                            line=dict(color='#2196F3')
-                        ))
-                        fig_pred.add_trace(go.Scatter(
-                            y=[actual_val], x=[0],
-                            mode='markers', name='Aktual',
-                            marker=dict(color='green', size=12, symbol='circle')
-                        ))
-                        fig_pred.add_trace(go.Scatter(
-                            y=[prediction_final], x=[0],
-                            mode='markers', name='Prediksi',
-                            marker=dict(color='red', size=12, symbol='x')
-                        ))
-                        fig_pred.update_layout(
-                            title=f"Visualisasi Prediksi PM2.5 — Stasiun {station_name}",
-                            xaxis_title="Jam Relatif (0 = waktu target)",
-                            yaxis_title="PM2.5 (µg/m³)",
-                            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                        )
-                        st.plotly_chart(fig_pred, use_container_width=True)
-
-                        # Peta lokasi stasiun
-                        st.write("#### 📍 Lokasi Stasiun Pemantauan")
-                        st.markdown(f"Berikut adalah posisi stasiun **{station_name}** pada peta Beijing:")
-
-                        station_coords = STATION_COORDS.get(station_name, [40.0, 116.4])
-                        pred_map = folium.Map(location=station_coords, zoom_start=11)
-
-                        # Semua stasiun lain sebagai titik abu-abu
-                        for st_name, coords in STATION_COORDS.items():
-                            if st_name != station_name:
-                                folium.CircleMarker(
-                                    location=coords,
-                                    radius=6,
-                                    color='#888888',
-                                    fill=True,
-                                    fill_color='#888888',
-                                    fill_opacity=0.5,
-                                    popup=folium.Popup(st_name, parse_html=True)
-                                ).add_to(pred_map)
-
-                        # Stasiun terpilih: titik kuning besar
-                        folium.CircleMarker(
-                            location=station_coords,
-                            radius=16,
-                            color='#B8860B',
-                            fill=True,
-                            fill_color='#FFD700',
-                            fill_opacity=0.95,
-                            popup=folium.Popup(
-                                f"<b>📍 {station_name}</b><br>Lat: {station_coords[0]}<br>Lon: {station_coords[1]}",
-                                parse_html=True
-                            ),
-                            tooltip=f"⭐ {station_name} (dipilih)"
-                        ).add_to(pred_map)
-
-                        folium.Marker(
-                            location=station_coords,
-                            icon=folium.DivIcon(
-                                html=f'<div style="font-size:11px; font-weight:bold; color:#1a1a1a; '
-                                     f'background:rgba(255,215,0,0.85); padding:3px 7px; border-radius:5px; '
-                                     f'border:1.5px solid #B8860B; white-space:nowrap; margin-top:18px;">'
-                                     f'📍 {station_name}</div>',
-                                icon_size=(160, 30),
-                                icon_anchor=(80, 0)
+            else:
+                st.write("#### Simulasi Prediksi")
+                st.write("Pilih stasiun dan waktu untuk mengambil 24 jam data sebelumnya sebagai input model.")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    pred_station = st.selectbox("Pilih Stasiun", list(station_arrays), key='pred_station')
+                with col2:
+                    min_date, max_date = station_time_bounds(station_arrays)
+                    min_date = min_date + pd.Timedelta(days=2)
+                    pred_date = st.date_input("Pilih Tanggal", value=max_date, min_value=min_date, max_value=max_date,
+                                              key='pred_date')
+
+                pred_hour = st.slider("Pilih Jam", 0, 23, 12, key='pred_hour')
+
+                hc1, hc2 = st.columns(2)
+                with hc1:
+                    pred_horizon = st.select_slider("Horizon Prediksi (jam ke depan)", FORECAST_HORIZONS, value=1,
+                                                    key='pred_horizon')
+                with hc2:
+                    pred_strategy = st.radio("Strategi Multi-langkah", ["Rekursif", "Direct"], horizontal=True,
+                                             disabled=pred_horizon == 1, key='pred_strategy')
+
+                # Jika parameter input berubah, hapus hasil lama agar tidak membingungkan
+                current_key = f"{pred_station}_{pred_date}_{pred_hour}_{pred_horizon}_{pred_strategy}_{backend}"
+                if st.session_state.pred_result is not None:
+                    if st.session_state.pred_result.get('key') != current_key:
+                        st.session_state.pred_result = None
+
+                target_time = pd.to_datetime(f"{pred_date} {pred_hour}:00:00")
+                series = station_arrays[pred_station]
+                pos = locate_time(series, target_time)
+
+                if pos is not None:
+                    feature_cols = FEATURE_COLS
+                    window = input_window(series, pos)
+
+                    if window is not None:
+                        input_data = pd.DataFrame(window, columns=feature_cols,
+                                                  index=pd.DatetimeIndex(series['times'][pos-WINDOW_SIZE:pos], name='datetime'))
+                        actual_val = series['values'][pos, 0]
+
+                        st.write("Data Input (24 Jam Terakhir):")
+                        st.dataframe(input_data.tail())
+
+                        if st.button("🔍 Jalankan Prediksi", key='run_prediction'):
+                            with st.spinner("Menjalankan model LSTM..."):
+                                scalers = get_station_scalers(catalog, version)
+                                # Hasil dipakai bersama lintas sesi; kunci memuat versi model, backend & dataset
+                                pred_cache = get_prediction_cache()
+                                version_key = (get_model_version(backend), backend, version)
+
+                                def predict_one_step():
+                                    cache_miss()
+                                    data_min, scale = scaler_params(scalers, pred_station)
+                                    input_scaled = scale_features(window, data_min, scale)
+                                    input_reshaped = input_scaled.reshape(1, WINDOW_SIZE, len(feature_cols))
+                                    prediction_scaled = model.predict(input_reshaped, verbose=0)
+                                    return float(unscale_pm25(prediction_scaled[0, 0], data_min, scale))
+
+                                with stage('prediction_cache.step', cache=True):
+                                    prediction_final = pred_cache.get_or_compute(
+                                        ('step', pred_station, target_time, *version_key), predict_one_step)
+
+                                forecast_df = None
+                                if pred_horizon > 1:
+                                    strategy = 'recursive'
+                                    if pred_strategy == "Direct":
+                                        if supports_direct(model, pred_horizon):
+                                            strategy = 'direct'
+                                        else:
+                                            st.warning("Model hanya memiliki 1 output sehingga strategi Direct "
+                                                       "tidak tersedia; menggunakan strategi Rekursif.")
+                                    # Semua stasiun diprakirakan dalam satu batch
+                                    def forecast_all():
+                                        cache_miss()
+                                        return forecast_stations(model, station_arrays, scalers, target_time,
+                                                                 pred_horizon, strategy=strategy)
+
+                                    with stage('prediction_cache.forecast', cache=True):
+                                        forecast_df = pred_cache.get_or_compute(
+                                            ('forecast', target_time, pred_horizon, strategy, *version_key),
+                                            forecast_all)
+
+                            # Simpan semua hasil ke session_state — tidak akan hilang saat re-render
+                            st.session_state.pred_result = {
+                                'key': current_key,
+                                'prediction_final': prediction_final,
+                                'actual_val': float(actual_val),
+                                'history_pm25': input_data['PM2.5'].tolist(),
+                                'station': pred_station,
+                                'forecast': forecast_df,
+                            }
+
+                        # Render hasil dari session_state (persisten lintas re-render)
+                        if st.session_state.pred_result is not None:
+                            res = st.session_state.pred_result
+                            prediction_final = res['prediction_final']
+                            actual_val = res['actual_val']
+                            history_pm25 = res['history_pm25']
+                            station_name = res['station']
+
+                            st.markdown("---")
+                            st.write("#### 📊 Hasil Prediksi")
+
+                            m1, m2, m3 = st.columns(3)
+                            m1.metric(
+                                label="🤖 Prediksi PM2.5 (1 Jam ke depan)",
+                                value=f"{prediction_final:.2f} µg/m³"
+                            )
+                            m2.metric(
+                                label="✅ Nilai Aktual",
+                                value=f"{actual_val:.2f} µg/m³",
+                                delta=f"{prediction_final - actual_val:.2f}"
+                            )
+                            m3.metric(
+                                label="📏 Error Absolut",
+                                value=f"{abs(prediction_final - actual_val):.2f} µg/m³"
                             )
-                        ).add_to(pred_map)
+                            cache_stats = get_prediction_cache().stats()
+                            st.caption(f"🗃️ Cache prediksi: {cache_stats['hits'] + cache_stats['disk_hits']} hit · "
+                                       f"{cache_stats['misses']} miss · {cache_stats['entries']} entri")
+
+                            # Plot prediksi
+                            fig_pred = go.Figure()
+                            fig_pred.add_trace(go.Scatter(
+                                y=history_pm25, x=list(range(-24, 0)),
+                                mode='lines+markers', name='History (24h)',
+                                line=dict(color='#2196F3')
+                            ))
+                            fig_pred.add_trace(go.Scatter(
+                                y=[actual_val], x=[0],
+                                mode='markers', name='Aktual',
+                                marker=dict(color='green', size=12, symbol='circle')
+                            ))
+                            fig_pred.add_trace(go.Scatter(
+                                y=[prediction_final], x=[0],
+                                mode='markers', name='Prediksi',
+                                marker=dict(color='red', size=12, symbol='x')
+                            ))
+                            forecast_df = res.get('forecast')
+                            if forecast_df is not None and not forecast_df.empty:
+                                fc_station = forecast_df[forecast_df['station'] == station_name]
+                                fig_pred.add_trace(go.Scatter(
+                                    y=fc_station['actual'], x=fc_station['step'] - 1,
+                                    mode='lines', name='Aktual (horizon)',
+                                    line=dict(color='green', dash='dot')
+                                ))
+                                fig_pred.add_trace(go.Scatter(
+                                    y=fc_station['predicted'], x=fc_station['step'] - 1,
+                                    mode='lines+markers', name=f"Prakiraan {fc_station['step'].max()} jam",
+                                    line=dict(color='red')
+                                ))
+                            fig_pred.update_layout(
+                                title=f"Visualisasi Prediksi PM2.5 — Stasiun {station_name}",
+                                xaxis_title="Jam Relatif (0 = waktu target)",
+                                yaxis_title="PM2.5 (µg/m³)",
+                                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                            )
+                            st.plotly_chart(fig_pred, use_container_width=True)
+
+                            if forecast_df is not None and not forecast_df.empty:
+                                st.write(f"#### 🗓️ Prakiraan {forecast_df['step'].max()} Jam — Semua Stasiun")
+                                fc_summary = forecast_df.groupby('station').agg(
+                                    **{'Rata-rata Prakiraan': ('predicted', 'mean'),
+                                       'Maksimum Prakiraan': ('predicted', 'max'),
+                                       'Rata-rata Aktual': ('actual', 'mean')}
+                                ).round(2).reset_index().rename(columns={'station': 'Stasiun'})
+                                st.dataframe(fc_summary, use_container_width=True, hide_index=True)
 
-                        st_folium(pred_map, width=900, height=400)
+                            # Peta lokasi stasiun
+                            st.write("#### 📍 Lokasi Stasiun Pemantauan")
+                            st.markdown(f"Berikut adalah posisi stasiun **{station_name}** pada peta Beijing:")
 
+                            show_map(station_location_map_html(station_name), width=900, height=400)
+
+                    else:
+                        st.error("Data historis tidak cukup untuk membuat prediksi (kurang dari 24 jam).")
                 else:
-                    st.error("Data historis tidak cukup untuk membuat prediksi (kurang dari 24 jam).")
-            else:
-                st.error("Data untuk waktu yang dipilih tidak ditemukan.")
+                    st.error("Data untuk waktu yang dipilih tidak ditemukan.")
 
         except Exception as e:
             st.error(f"Terjadi error pada model: {e}")
@@ -810,4 +1224,21 @@ elif menu == "Kesimpulan 📝":
 
 # Footer
 st.markdown("---")
-st.markdown("© 2024 Proyek Data Science - Kelompok IF1")
\ No newline at end of file
+st.markdown("© 2024 Proyek Data Science - Kelompok IF1")
+
+# Waktu render run ini (termasuk import & load data pada cold start)
+total_seconds = time.perf_counter() - SCRIPT_START
+st.sidebar.caption(f"⏱️ Halaman dirender dalam {total_seconds:.2f} dtk")
+
+# Profil rerun ditutup (metrik proses + log JSON / teks Prometheus bila diaktifkan lewat env)
+profile_report = finish_profile(profile, total_seconds)
+if st.sidebar.toggle("🔬 Panel profil (debug)", value=PROFILE_PANEL, key='profile_panel'):
+    with st.sidebar.expander("Profil rerun ini", expanded=True):
+        st.caption(f"Halaman: {profile.page} · aksi: {profile.action} · total {total_seconds * 1e3:.0f} ms")
+        if profile.records:
+            st.dataframe(profile_table(profile.records), hide_index=True, use_container_width=True)
+        st.download_button("Log JSON", json.dumps(profile_report, default=str), file_name='profile.json',
+                           mime='application/json')
+        st.download_button("Metrik Prometheus", PROFILE_METRICS.prometheus_text(), file_name='metrics.prom',
+                           mime='text/plain')
+st.session_state['_profile_widgets'] = widget_snapshot()
\ No newline at end of file